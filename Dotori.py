@@ -1,16 +1,26 @@
-import discord
-from discord import app_commands
 import json
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 import asyncio
 import aiohttp
 from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
 import pytz
 import urllib.parse
 import re
+import html
 import io
 import os
+import random
+import time
+import hashlib
+import sqlite3
+import heapq
+import itertools
+import contextvars
+import functools
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -24,12 +34,94 @@ class Config:
     HENRIK_API_KEY = os.getenv('HENRIK_API_KEY')
     LOL_API_KEY = os.getenv('LOL_API_KEY')
     
-    TELEGRAM_CHATS_FILE = 'telegram_chats.json'
-    VAL_MATCH_URL = "https://vlrggapi.vercel.app/match?q=upcoming"
-    VAL_LIVE_URL = "https://vlrggapi.vercel.app/match?q=live_score"
-    VAL_SEASON_URL = "https://valorant-api.com/v1/seasons/competitive"
-    VAL_PATCH_URL = "https://api.henrikdev.xyz/valorant/v1/website/ko-kr"
+    TELEGRAM_CHATS_FILE = 'telegram_chats.json'   # 이전 버전 목록 (최초 1회 DB 로 옮김)
+    CHAT_FLUSH_DELAY = 5
+    DB_FILE = os.getenv('DB_FILE', 'dotori.db')
+    ACCOUNT_CACHE_TTL = 24 * 3600
+    # 아는 플레이어는 size 1 로 새 경기 여부만 확인하고, 있으면 한 번에 10판 (Henrik 호출 최대 2번)
+    MATCH_FETCH_STEPS = (1, 10)
+
+    # 외부 API 주소 (벤치마크 등에서 로컬 목 서버로 바꿀 수 있음)
+    VLR_API_BASE = os.getenv('VLR_API_BASE', "https://vlrggapi.vercel.app")
+    VALORANT_API_BASE = os.getenv('VALORANT_API_BASE', "https://valorant-api.com")
+    HENRIK_API_BASE = os.getenv('HENRIK_API_BASE', "https://api.henrikdev.xyz")
+    LOL_API_BASE = os.getenv('LOL_API_BASE', "https://esports-api.lolesports.com")
+    LIQUIPEDIA_BASE = os.getenv('LIQUIPEDIA_BASE', "https://liquipedia.net")
+    VAL_MATCH_URL = f"{VLR_API_BASE}/match?q=upcoming"
+    VAL_LIVE_URL = f"{VLR_API_BASE}/match?q=live_score"
+    VAL_RESULTS_URL = f"{VLR_API_BASE}/match?q=results"
+    VAL_SEASON_URL = f"{VALORANT_API_BASE}/v1/seasons/competitive"
+    VAL_PATCH_URL = f"{HENRIK_API_BASE}/valorant/v1/website/ko-kr"
+
+    # HTTP 클라이언트 (커넥션 풀 / 타임아웃 / 재시도)
+    HTTP_POOL_LIMIT = 100
+    HTTP_POOL_LIMIT_PER_HOST = 10
+    HTTP_KEEPALIVE = 30
+    HTTP_DNS_TTL = 300
+    HTTP_CONNECT_TIMEOUT = 5
+    HTTP_READ_TIMEOUT = 15
+    HTTP_MAX_RETRIES = 2
+    HTTP_RETRY_BACKOFF = 0.5
+
+    # Henrik API 요청 제한 (키 등급에 맞게 설정, 응답 헤더로 자동 보정)
+    HENRIK_RATE_LIMIT = int(os.getenv('HENRIK_RATE_LIMIT', 30))
+    HENRIK_RATE_WINDOW = 60
+    RATE_LIMIT_MAX_WAITS = 3
+
+    # 라이브 스코어 알림
+    LIVE_POLL_INTERVAL = int(os.getenv('LIVE_POLL_INTERVAL', 30))
+    LIVE_END_POLLS = 3           # 결과 목록에 없을 때, 이만큼 연속으로 빠져야 종료로 판단
+    LIVE_RESULT_MAX_AGE = 6 * 3600
+    TG_GLOBAL_RATE = 25          # 초당 전체 전송 수
+    TG_CHAT_INTERVAL = 3         # 같은 채팅 연속 전송 간격 (그룹 분당 20개 제한)
+    TG_MAX_SEND_RETRIES = 3
+
+    # 성능 지표 (/metrics 엔드포인트, 0 이면 끔) 및 /perf 관리자 (텔레그램 user id, 쉼표 구분)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+    ADMIN_IDS = {i.strip() for i in os.getenv('ADMIN_IDS', '').split(',') if i.strip()}
+    LOOP_LAG_INTERVAL = 0.5
+
+    # 시작 시 일정 / 시즌 정보 미리 받아두기
+    WARMUP = os.getenv('WARMUP', '1') == '1'
+    RESTART_MAX_DELAY = 60
+
+    # 응답 캐시 (초)
+    CACHE_MAX_ENTRIES = 512
+    CACHE_TTL_LIVE = 15
+    CACHE_TTL_UPCOMING = 300
+    CACHE_TTL_SEASON = 6 * 3600
+    CACHE_TTL_MESSAGE = 10
+    CACHE_TTL_STAT = 60
+
+    # /stat 다중 검색
+    STAT_MAX_PLAYERS = 10
+    STAT_CONCURRENCY = int(os.getenv('STAT_CONCURRENCY', 4))
+    TELEGRAM_MSG_LIMIT = 4096
+    DISCORD_MSG_LIMIT = 2000
+    STREAM_EDIT_INTERVAL = 1.0   # 같은 응답 메시지 수정 최소 간격 (초)
+    STREAM_MAX_RETRIES = 3       # flood-wait(RetryAfter) 시 재시도 횟수
+
+    # 대진표 캡처용 브라우저 풀
+    BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', 2))
+    BROWSER_VIEWPORT = {'width': 5000, 'height': 2000}
+
+    # 대진표 이미지 캐시 (초)
+    VCT_REGIONS = ['Pacific', 'Americas', 'EMEA', 'China', 'Masters/Champions']
+    BRACKET_REFRESH_INTERVAL = int(os.getenv('BRACKET_REFRESH_INTERVAL', 3600))
+
+    # 대진표 이미지 후처리 (여백 제거 / 축소 / 재압축)
+    IMAGE_MAX_WIDTH = int(os.getenv('IMAGE_MAX_WIDTH', 2560))
+    IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'JPEG')   # JPEG / WEBP / PNG
+    IMAGE_SIZE_BUDGET = int(os.getenv('IMAGE_SIZE_BUDGET', 1_500_000))
+    IMAGE_TRIM_THRESHOLD = 16
+    IMAGE_TRIM_PADDING = 16
+    IMAGE_WORKERS = 2
     
+    LOL_SCHEDULE_URL = f"{LOL_API_BASE}/persisted/gw/getSchedule"
+    LOL_REFRESH_INTERVAL = 300
+    LOL_MAX_PAGES = 3
+    LOL_WINDOW_DAYS = 10
     LOL_LEAGUES = {
         "First Stand": "113464388705111224", "LCK": "98767991310872058",
         "MSI": "98767991325878492", "Worlds": "98767975604431411"   
@@ -48,6 +140,731 @@ class Config:
         'Team Secret', 'ZETA DIVISION', 'Nongshim RedForce', 'VARREL'
     }
 
+# ================ [성능 지표] ================
+class Metrics:
+    """카운터 / 게이지 / 히스토그램을 메모리에 모으고 Prometheus 텍스트 형식과 /perf 요약으로 노출"""
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    HELP = {
+        'dotori_command_seconds': ('histogram', '명령 처리 시간'),
+        'dotori_command_errors_total': ('counter', '명령 처리 중 예외 (핸들러가 직접 잡은 예외 포함)'),
+        'dotori_command_inflight': ('gauge', '처리 중인 명령 수'),
+        'dotori_upstream_seconds': ('histogram', '외부 API 요청 시간 (재시도 포함)'),
+        'dotori_upstream_errors_total': ('counter', '외부 API 실패 (kind=timeout/connection/http_4xx/http_5xx/http_429/error)'),
+        'dotori_upstream_inflight': ('gauge', '진행 중인 외부 API 요청 수'),
+        'dotori_platform_seconds': ('histogram', '텔레그램/디스코드 전송·수정 호출 시간'),
+        'dotori_platform_inflight': ('gauge', '진행 중인 텔레그램/디스코드 전송·수정 호출 수'),
+        'dotori_capture_seconds': ('histogram', '대진표 브라우저 캡처 시간'),
+        'dotori_capture_inflight': ('gauge', '진행 중인 대진표 캡처 수'),
+        'dotori_capture_errors_total': ('counter', '대진표 캡처 실패'),
+        'dotori_loop_lag_seconds': ('gauge', '이벤트 루프 지연 (최근 측정값)'),
+        'dotori_loop_lag_max_seconds': ('gauge', '이벤트 루프 지연 (최대값)'),
+    }
+    _counters = {}
+    _gauges = {}
+    _hists = {}         # (name, labels) -> [버킷별 개수..., +Inf, sum]
+    _lag_task = None
+    _server = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    @classmethod
+    def inc(cls, name, value=1, **labels):
+        key = cls._key(name, labels); cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def set(cls, name, value, **labels):
+        cls._gauges[cls._key(name, labels)] = value
+
+    @classmethod
+    def add(cls, name, value, **labels):
+        key = cls._key(name, labels); cls._gauges[key] = cls._gauges.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, value, **labels):
+        h = cls._hists.setdefault(cls._key(name, labels), [0] * (len(cls.BUCKETS) + 2))
+        for i, b in enumerate(cls.BUCKETS):
+            if value <= b: h[i] += 1; break
+        else: h[len(cls.BUCKETS)] += 1
+        h[-1] += value
+
+    @classmethod
+    @asynccontextmanager
+    async def track(cls, prefix, error_name=None, **labels):
+        """<prefix>_seconds / _inflight 기록, 예외 시 error_name 카운터 증가"""
+        cls.add(f"{prefix}_inflight", 1, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if error_name: cls.inc(error_name, **labels)
+            raise
+        finally:
+            cls.observe(f"{prefix}_seconds", time.perf_counter() - start, **labels)
+            cls.add(f"{prefix}_inflight", -1, **labels)
+
+    @classmethod
+    def instrument(cls, command):
+        """핸들러 데코레이터: 명령별 처리 시간 / 처리 중 개수 / 예외 수"""
+        def deco(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                async with cls.track('dotori_command', 'dotori_command_errors_total', command=command):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    @classmethod
+    def quantile(cls, h, q):
+        total = sum(h[:-1])
+        if not total: return 0
+        seen = 0
+        for i, b in enumerate(cls.BUCKETS):
+            seen += h[i]
+            if seen >= total * q: return b
+        return float('inf')
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items: return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+    @classmethod
+    def render_prometheus(cls):
+        out, typed = [], set()
+        def header(name):
+            if name in typed: return
+            typed.add(name)
+            kind, text = cls.HELP.get(name, ('untyped', name))
+            out.append(f"# HELP {name} {text}"); out.append(f"# TYPE {name} {kind}")
+        for (name, labels), v in sorted(cls._counters.items()):
+            header(name); out.append(f"{name}{cls._labels(labels)} {v}")
+        for (name, labels), v in sorted(cls._gauges.items()):
+            header(name); out.append(f"{name}{cls._labels(labels)} {v}")
+        for (name, labels), h in sorted(cls._hists.items()):
+            header(name)
+            acc = 0
+            for i, b in enumerate(cls.BUCKETS):
+                acc += h[i]; out.append(f"{name}_bucket{cls._labels(labels, [('le', b)])} {acc}")
+            acc += h[len(cls.BUCKETS)]
+            out.append(f"{name}_bucket{cls._labels(labels, [('le', '+Inf')])} {acc}")
+            out.append(f"{name}_sum{cls._labels(labels)} {h[-1]:.6f}")
+            out.append(f"{name}_count{cls._labels(labels)} {acc}")
+        return "\n".join(out) + "\n"
+
+    @classmethod
+    def summary(cls, name):
+        """/perf 용 (label, count, avg, p50, p95) 목록"""
+        rows = []
+        for (n, labels), h in sorted(cls._hists.items()):
+            if n != name: continue
+            count = sum(h[:-1])
+            rows.append((",".join(str(v) for _, v in labels), count, h[-1] / count if count else 0, cls.quantile(h, 0.5), cls.quantile(h, 0.95)))
+        return rows
+
+    @classmethod
+    async def _watch_loop_lag(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(Config.LOOP_LAG_INTERVAL)
+            lag = max(loop.time() - start - Config.LOOP_LAG_INTERVAL, 0)
+            cls.set('dotori_loop_lag_seconds', round(lag, 6))
+            cls.set('dotori_loop_lag_max_seconds', max(lag, cls._gauges.get(('dotori_loop_lag_max_seconds', ()), 0)))
+
+    @classmethod
+    async def start(cls):
+        if cls._lag_task is None: cls._lag_task = asyncio.create_task(cls._watch_loop_lag())
+        if not Config.METRICS_PORT or cls._server: return
+        from aiohttp import web
+        async def handle(request):
+            return web.Response(text=cls.render_prometheus(), content_type='text/plain', charset='utf-8')
+        app = web.Application(); app.router.add_get('/metrics', handle)
+        cls._server = web.AppRunner(app, access_log=None)
+        await cls._server.setup()
+        try: await web.TCPSite(cls._server, Config.METRICS_HOST, Config.METRICS_PORT).start()
+        except OSError as e: print(f"Metrics Server Error: {e}")
+
+    @classmethod
+    async def stop(cls):
+        if cls._lag_task: cls._lag_task.cancel(); cls._lag_task = None
+        if cls._server: await cls._server.cleanup(); cls._server = None
+
+# ================ [HTTP 클라이언트] ================
+# 현재 작업의 요청 우선순위 (백그라운드 작업은 BACKGROUND 로 설정, 하위 태스크에 상속됨)
+INTERACTIVE, BACKGROUND = 0, 1
+request_priority = contextvars.ContextVar('request_priority', default=INTERACTIVE)
+
+class RateLimiter:
+    """토큰 버킷 + 우선순위 대기열. 토큰이 없으면 버리지 않고 순서대로 기다림"""
+    def __init__(self, limit, window):
+        self.window = window
+        self.configure(limit)
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._worker = None
+
+    def configure(self, limit):
+        self.limit = max(int(limit), 1)
+        self.fill_rate = self.limit / self.window
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+        return now
+
+    async def acquire(self, priority=None):
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (request_priority.get() if priority is None else priority, next(self._seq), fut))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._dispatch())
+        await fut
+
+    async def _dispatch(self):
+        while self._queue:
+            now = self._refill()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now); continue
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate); continue
+            _, _, fut = heapq.heappop(self._queue)
+            if fut.done(): continue
+            self.tokens -= 1
+            fut.set_result(None)
+
+    def observe(self, headers):
+        """x-ratelimit-* 헤더로 남은 양과 한도를 보정"""
+        try:
+            if headers.get('x-ratelimit-limit'): self.configure(headers['x-ratelimit-limit'])
+            remaining = headers.get('x-ratelimit-remaining')
+            if remaining is not None:
+                self._refill(); self.tokens = min(self.tokens, float(remaining))
+                reset = headers.get('x-ratelimit-reset')
+                if float(remaining) <= 0 and reset: self.block(float(reset))
+        except ValueError: pass
+
+    def block(self, seconds):
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def retry_after(self, headers):
+        for name in ('Retry-After', 'x-ratelimit-reset'):
+            value = headers.get(name)
+            if not value: continue
+            try: return max(float(value), 0)
+            except ValueError: pass
+            try: return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+            except (TypeError, ValueError): pass
+        return self.window / self.limit
+
+class UpstreamError(Exception):
+    """외부 API 일시 장애 (429 대기 / 5xx·타임아웃 재시도 소진). '없음'(4xx → None) 과 구분"""
+
+class HttpClient:
+    """봇 전체가 공유하는 aiohttp 세션 (봇 시작 시 생성, 종료 시 정리)"""
+    _session = None
+    limiters = [(Config.HENRIK_API_BASE, RateLimiter(Config.HENRIK_RATE_LIMIT, Config.HENRIK_RATE_WINDOW))]
+
+    @classmethod
+    async def start(cls):
+        if cls._session and not cls._session.closed: return cls._session
+        connector = aiohttp.TCPConnector(
+            limit=Config.HTTP_POOL_LIMIT, limit_per_host=Config.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=Config.HTTP_KEEPALIVE, ttl_dns_cache=Config.HTTP_DNS_TTL
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=Config.HTTP_CONNECT_TIMEOUT + Config.HTTP_READ_TIMEOUT,
+            connect=Config.HTTP_CONNECT_TIMEOUT, sock_read=Config.HTTP_READ_TIMEOUT
+        )
+        cls._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return cls._session
+
+    @classmethod
+    async def close(cls):
+        if cls._session and not cls._session.closed: await cls._session.close()
+        cls._session = None
+
+    @classmethod
+    async def session(cls):
+        if cls._session is None or cls._session.closed: await cls.start()
+        return cls._session
+
+    @staticmethod
+    def backoff(attempt):
+        # 지수 백오프 + full jitter
+        return random.uniform(0, Config.HTTP_RETRY_BACKOFF * (2 ** attempt))
+
+    @classmethod
+    async def get_json(cls, url, headers=None, params=None, endpoint=None):
+        """5xx / 타임아웃은 제한된 횟수만큼 재시도, 429 는 Retry-After 만큼 대기 후 재시도.
+        재시도를 다 써도 실패하면 UpstreamError, 그 외 실패(4xx 등)는 None"""
+        endpoint = endpoint or urllib.parse.urlsplit(url).hostname
+        async with Metrics.track('dotori_upstream', endpoint=endpoint):
+            return await cls._get_json(url, headers, params, endpoint)
+
+    @classmethod
+    async def _get_json(cls, url, headers, params, endpoint):
+        session = await cls.session()
+        limiter = next((lim for prefix, lim in cls.limiters if url.startswith(prefix)), None)
+        attempt, waits = 0, 0
+        while True:
+            last = attempt >= Config.HTTP_MAX_RETRIES
+            if limiter: await limiter.acquire()
+            try:
+                async with session.get(url, headers=headers, params=params) as response:
+                    if limiter: limiter.observe(response.headers)
+                    if response.status == 200:
+                        return await response.json(content_type=None)
+                    Metrics.inc('dotori_upstream_errors_total', endpoint=endpoint, kind=f"http_{response.status}" if response.status == 429 else f"http_{response.status // 100}xx")
+                    if response.status == 429:
+                        if not limiter or waits >= Config.RATE_LIMIT_MAX_WAITS: raise UpstreamError(f"{endpoint}: rate limited")
+                        waits += 1
+                        limiter.block(limiter.retry_after(response.headers))
+                        continue
+                    if response.status < 500: return None
+                    if last: raise UpstreamError(f"{endpoint}: HTTP {response.status}")
+            except UpstreamError:
+                raise
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                Metrics.inc('dotori_upstream_errors_total', endpoint=endpoint, kind='timeout' if isinstance(e, asyncio.TimeoutError) else 'connection')
+                if last:
+                    print(f"API Error ({url}): {e!r}")
+                    raise UpstreamError(f"{endpoint}: {e!r}") from e
+            except Exception as e:
+                Metrics.inc('dotori_upstream_errors_total', endpoint=endpoint, kind='error')
+                print(f"API Error ({url}): {e}")
+                return None
+            await asyncio.sleep(cls.backoff(attempt))
+            attempt += 1
+
+# ================ [응답 캐시] ================
+class AsyncTTLCache:
+    """키별 TTL + LRU 캐시. 만료 후 stale 구간에는 이전 값을 주면서 뒤에서 갱신하고,
+    같은 키의 동시 요청은 하나의 fetch 로 합침 (single-flight)"""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()   # key -> (value, fresh_until, stale_until)
+        self._inflight = {}
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception():
+            print(f"Cache Refresh Error ({key}): {task.exception()}")
+
+    def _refresh(self, key, fetch, ttl, stale, background=False):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, fetch, ttl, stale, background))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    async def _load(self, key, fetch, ttl, stale, background):
+        # 만료 후 뒤에서 하는 갱신은 사용자 요청보다 낮은 우선순위로 (태스크 안에서만 적용됨)
+        if background: request_priority.set(BACKGROUND)
+        value = await fetch()
+        # 실패(None)와 오류 결과(Doc.error)는 캐시하지 않음
+        if value is not None and not getattr(value, 'error', False):
+            now = time.monotonic()
+            self._data[key] = (value, now + ttl, now + ttl + stale)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: self._data.popitem(last=False)
+        return value
+
+    async def get(self, key, fetch, ttl, stale=None):
+        stale = ttl if stale is None else stale
+        item = self._data.get(key)
+        if item:
+            value, fresh_until, stale_until = item
+            now = time.monotonic()
+            if now < stale_until:
+                self._data.move_to_end(key)
+                if now >= fresh_until: self._refresh(key, fetch, ttl, stale, background=True)
+                return value
+            del self._data[key]
+        return await asyncio.shield(self._refresh(key, fetch, ttl, stale))
+
+    def clear(self):
+        self._data.clear()
+
+response_cache = AsyncTTLCache(Config.CACHE_MAX_ENTRIES)
+
+# ================ [로컬 저장소] ================
+class Storage:
+    """SQLite 연결 하나를 전용 스레드에서만 사용 (이벤트 루프에서 디스크 I/O 를 하지 않음)"""
+    _conn = None
+    _executor = None
+
+    @classmethod
+    def _connect(cls):
+        if cls._conn is None:
+            cls._conn = sqlite3.connect(Config.DB_FILE, check_same_thread=False)
+            cls._conn.execute("PRAGMA journal_mode=WAL")
+            cls._conn.execute("PRAGMA synchronous=NORMAL")
+        return cls._conn
+
+    @classmethod
+    async def run(cls, fn, *args):
+        if cls._executor is None: cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+        return await asyncio.get_running_loop().run_in_executor(cls._executor, lambda: fn(cls._connect(), *args))
+
+    @classmethod
+    async def close(cls):
+        if cls._executor is None: return
+        def _close(conn):
+            conn.close(); cls._conn = None
+        if cls._conn: await cls.run(_close)
+        cls._executor.shutdown(wait=True); cls._executor = None
+
+class MatchStore:
+    """계정(puuid) 조회 결과와 경쟁전 요약 / RR 변동만 저장 (원본 매치 데이터는 저장하지 않음)"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            riot_id TEXT PRIMARY KEY, puuid TEXT NOT NULL, region TEXT NOT NULL, updated_at REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS matches (
+            puuid TEXT NOT NULL, match_id TEXT NOT NULL, game_start INTEGER NOT NULL, result TEXT,
+            kills INTEGER, deaths INTEGER, assists INTEGER, score INTEGER, rounds INTEGER, map TEXT,
+            PRIMARY KEY (puuid, match_id));
+        CREATE INDEX IF NOT EXISTS matches_recent ON matches (puuid, game_start DESC);
+        CREATE TABLE IF NOT EXISTS rr_changes (
+            puuid TEXT NOT NULL, match_id TEXT NOT NULL, delta INTEGER NOT NULL, PRIMARY KEY (puuid, match_id));
+    """
+    FIELDS = ('match_id', 'game_start', 'result', 'kills', 'deaths', 'assists', 'score', 'rounds', 'map')
+    _ready = False
+
+    @classmethod
+    async def _run(cls, fn, *args):
+        if not cls._ready:
+            await Storage.run(lambda conn: conn.executescript(cls.SCHEMA))
+            cls._ready = True
+        return await Storage.run(fn, *args)
+
+    @staticmethod
+    def summarize(match, puuid):
+        """v3 매치 문서에서 get_player_stats 가 쓰는 값만 추출"""
+        meta = match.get('metadata')
+        # match id 가 없으면 저장 키도, RR 변동과 맞출 방법도 없으므로 건너뜀
+        if not meta or not meta.get('matchid') or meta.get('game_start', 0) == 0: return None
+        me = next((p for p in match.get('players', {}).get('all_players', []) if p['puuid'] == puuid), None)
+        if not me: return None
+        st = me.get('stats', {})
+        result, team = None, match.get('teams', {}).get(me['team'].lower())
+        if team:
+            result = "승리" if team.get('has_won') else ("무승부" if team.get('rounds_won') == team.get('rounds_lost') else "패배")
+        return {
+            'match_id': meta['matchid'], 'game_start': meta['game_start'], 'result': result,
+            'kills': st.get('kills', 0), 'deaths': st.get('deaths', 0), 'assists': st.get('assists', 0),
+            'score': st.get('score', 0), 'rounds': meta.get('rounds_played', 1), 'map': meta.get('map')
+        }
+
+    @classmethod
+    async def get_account(cls, name, tag):
+        def q(conn):
+            return conn.execute("SELECT puuid, region FROM accounts WHERE riot_id = ? AND updated_at > ?",
+                                (f"{name}#{tag}".lower(), time.time() - Config.ACCOUNT_CACHE_TTL)).fetchone()
+        return await cls._run(q)
+
+    @classmethod
+    async def save_account(cls, name, tag, puuid, region):
+        def q(conn):
+            with conn: conn.execute("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)", (f"{name}#{tag}".lower(), puuid, region, time.time()))
+        await cls._run(q)
+
+    @classmethod
+    async def recent_matches(cls, puuid, limit=10):
+        def q(conn):
+            rows = conn.execute(f"SELECT {', '.join(cls.FIELDS)} FROM matches WHERE puuid = ? ORDER BY game_start DESC LIMIT ?", (puuid, limit)).fetchall()
+            return [dict(zip(cls.FIELDS, r)) for r in rows]
+        return await cls._run(q)
+
+    @classmethod
+    async def save_matches(cls, puuid, summaries):
+        def q(conn):
+            with conn:
+                conn.executemany(f"INSERT OR REPLACE INTO matches VALUES (?, {', '.join('?' * len(cls.FIELDS))})",
+                                 [(puuid, *(m[f] for f in cls.FIELDS)) for m in summaries])
+        if summaries: await cls._run(q)
+
+    @classmethod
+    async def rr_changes(cls, puuid):
+        return await cls._run(lambda conn: dict(conn.execute("SELECT match_id, delta FROM rr_changes WHERE puuid = ?", (puuid,)).fetchall()))
+
+    @classmethod
+    async def save_rr_changes(cls, puuid, changes):
+        def q(conn):
+            with conn: conn.executemany("INSERT OR REPLACE INTO rr_changes VALUES (?, ?, ?)", [(puuid, mid, d) for mid, d in changes.items()])
+        if changes: await cls._run(q)
+
+class ChatRegistry:
+    """텔레그램 채팅 목록: 메모리 인덱스 + SQLite. 변경분은 모아서 지연 저장 (명령 처리 중 디스크 I/O 없음)"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS telegram_chats (chat_id TEXT PRIMARY KEY, name TEXT NOT NULL, updated_at REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS live_subscriptions (chat_id TEXT PRIMARY KEY);
+    """
+    _chats = {}
+    _subscribers = set()
+    _pending = {}
+    _flush_task = None
+    _loaded = False
+
+    @classmethod
+    async def load(cls):
+        if cls._loaded: return cls._chats
+        def q(conn):
+            conn.executescript(cls.SCHEMA)
+            chats = dict(conn.execute("SELECT chat_id, name FROM telegram_chats").fetchall())
+            return chats, {r[0] for r in conn.execute("SELECT chat_id FROM live_subscriptions")}
+        cls._chats, cls._subscribers = await Storage.run(q)
+        if not cls._chats: await cls._migrate_json()
+        cls._loaded = True
+        return cls._chats
+
+    @classmethod
+    async def _migrate_json(cls):
+        try:
+            with open(Config.TELEGRAM_CHATS_FILE, 'r', encoding='utf-8') as f: legacy = json.load(f).get('chats', {})
+        except (OSError, ValueError): return
+        for cid, info in legacy.items(): cls.register(cid, info.get('name', ''))
+        await cls.flush()
+
+    @classmethod
+    def register(cls, cid, name):
+        if cls._chats.get(cid) == name: return
+        cls._chats[cid] = cls._pending[cid] = name
+        if cls._flush_task is None or cls._flush_task.done():
+            cls._flush_task = asyncio.create_task(cls._flush_later())
+
+    @classmethod
+    async def _flush_later(cls):
+        await asyncio.sleep(Config.CHAT_FLUSH_DELAY)
+        await cls.flush()
+
+    @classmethod
+    async def flush(cls):
+        if not cls._pending: return
+        batch, cls._pending = cls._pending, {}
+        now = time.time()
+        def q(conn):
+            with conn: conn.executemany("INSERT OR REPLACE INTO telegram_chats VALUES (?, ?, ?)", [(cid, name, now) for cid, name in batch.items()])
+        try: await Storage.run(q)
+        except Exception as e:
+            print(f"Chat Flush Error: {e}")
+            for cid, name in batch.items(): cls._pending.setdefault(cid, name)
+
+    @classmethod
+    def chats(cls):
+        return cls._chats
+
+    @classmethod
+    def subscribers(cls):
+        return cls._subscribers
+
+    @classmethod
+    async def set_subscribed(cls, cid, on):
+        """라이브 알림 구독 on/off (드물게 호출되므로 바로 저장)"""
+        (cls._subscribers.add if on else cls._subscribers.discard)(cid)
+        sql = "INSERT OR IGNORE INTO live_subscriptions VALUES (?)" if on else "DELETE FROM live_subscriptions WHERE chat_id = ?"
+        def q(conn):
+            with conn: conn.execute(sql, (cid,))
+        await Storage.run(q)
+
+    @classmethod
+    async def close(cls):
+        if cls._flush_task and not cls._flush_task.done(): cls._flush_task.cancel()
+        await cls.flush()
+
+# ================ [브라우저 풀] ================
+class BrowserPool:
+    """재사용되는 Chromium 한 개 + 컨텍스트 풀 (첫 캡처 시 실행, 봇 종료 시 정리)"""
+    _pw = None
+    _browser = None
+    _contexts = None
+    _sem = None
+    _lock = None
+
+    @classmethod
+    async def _ensure_browser(cls):
+        if cls._lock is None: cls._lock = asyncio.Lock()
+        async with cls._lock:
+            if cls._browser and cls._browser.is_connected(): return cls._browser
+            if cls._browser: print("Browser disconnected, relaunching")
+            if cls._pw is None:
+                from playwright.async_api import async_playwright
+                cls._pw = await async_playwright().start()
+            cls._browser = await cls._pw.chromium.launch(headless=True)
+            cls._contexts = asyncio.Queue(maxsize=Config.BROWSER_MAX_PAGES)
+            return cls._browser
+
+    @classmethod
+    @asynccontextmanager
+    async def page(cls):
+        # 동시 캡처 수 제한 (여러 채팅에서 동시에 눌러도 Chromium 은 하나)
+        if cls._sem is None: cls._sem = asyncio.Semaphore(Config.BROWSER_MAX_PAGES)
+        async with cls._sem:
+            browser = await cls._ensure_browser()
+            try: context = cls._contexts.get_nowait()
+            except asyncio.QueueEmpty:
+                context = await browser.new_context(viewport=Config.BROWSER_VIEWPORT, color_scheme='dark')
+            page = context.pages[0] if context.pages else await context.new_page()
+            reusable = False
+            try:
+                yield page
+                reusable = True
+            finally:
+                if reusable and context.browser is cls._browser and browser.is_connected() and not cls._contexts.full():
+                    cls._contexts.put_nowait(context)
+                else:
+                    try: await context.close()
+                    except Exception: pass
+
+    @classmethod
+    def is_alive(cls):
+        return bool(cls._browser and cls._browser.is_connected())
+
+    @classmethod
+    async def close(cls):
+        try:
+            if cls._browser: await cls._browser.close()
+            if cls._pw: await cls._pw.stop()
+        except Exception as e:
+            print(f"Browser Close Error: {e}")
+        cls._browser = cls._pw = None
+
+# ================ [이미지 후처리] ================
+class ImageProcessor:
+    """캡처한 PNG 의 어두운 여백을 잘라내고 축소 후 용량 예산 안으로 재압축 (별도 스레드에서 실행)"""
+    _executor = None
+
+    @staticmethod
+    def _trim(img):
+        from PIL import Image, ImageChops
+        bg = Image.new('RGB', img.size, img.getpixel((0, 0)))
+        mask = ImageChops.difference(img, bg).convert('L').point(lambda v: 255 if v > Config.IMAGE_TRIM_THRESHOLD else 0)
+        bbox = mask.getbbox()
+        if not bbox: return img
+        pad = Config.IMAGE_TRIM_PADDING
+        return img.crop((max(bbox[0] - pad, 0), max(bbox[1] - pad, 0), min(bbox[2] + pad, img.width), min(bbox[3] + pad, img.height)))
+
+    @staticmethod
+    def _encode(img, fmt, quality):
+        buf = io.BytesIO()
+        if fmt == 'PNG': img.save(buf, 'PNG', optimize=True)
+        elif fmt == 'WEBP': img.save(buf, 'WEBP', quality=quality, method=6)
+        else: img.save(buf, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return buf.getvalue()
+
+    @staticmethod
+    def process(data):
+        from PIL import Image
+        img = Image.open(io.BytesIO(data)).convert('RGB')
+        img = ImageProcessor._trim(img)
+        fmt = Config.IMAGE_FORMAT.upper()
+        width = min(img.width, Config.IMAGE_MAX_WIDTH)
+        while True:
+            scaled = img if width == img.width else img.resize((width, max(round(img.height * width / img.width), 1)), Image.LANCZOS)
+            for quality in ((None,) if fmt == 'PNG' else (85, 75, 65)):
+                out = ImageProcessor._encode(scaled, fmt, quality)
+                if len(out) <= Config.IMAGE_SIZE_BUDGET: return out
+            # 품질을 낮춰도 예산을 넘으면 해상도를 줄여서 다시 시도
+            if width <= 800: return out
+            width = int(width * 0.8)
+
+    @classmethod
+    async def run(cls, data):
+        if cls._executor is None: cls._executor = ThreadPoolExecutor(max_workers=Config.IMAGE_WORKERS, thread_name_prefix='img')
+        try:
+            out = await asyncio.get_running_loop().run_in_executor(cls._executor, cls.process, data)
+        except ImportError:
+            return data
+        except Exception as e:
+            print(f"Image Process Error: {e}")
+            return data
+        if len(out) >= len(data): return data
+        print(f"Image processed: {len(data):,} -> {len(out):,} bytes (saved {len(data) - len(out):,})")
+        return out
+
+    @classmethod
+    def close(cls):
+        if cls._executor: cls._executor.shutdown(wait=False)
+        cls._executor = None
+
+# ================ [메시지 모델] ================
+class Doc:
+    """서비스 결과의 구조화된 표현 (줄 / 강조 / 링크 / 코드 블록).
+    플랫폼별 렌더링(html: 텔레그램, markdown: 디스코드)은 한 번만 만들고 캐시해서 재사용
+
+    span: str(일반 텍스트) 또는 ('b'|'i'|'u', *spans), ('code', text), ('link', url, *spans)"""
+    MD_WRAP = {'b': '**', 'i': '*', 'u': '__'}
+
+    def __init__(self, error=False):
+        self.blocks = []      # ('line', spans) / ('pre', [spans, ...])
+        self.error = error
+        self._rendered = {}
+
+    @classmethod
+    def text(cls, *spans, error=False):
+        return cls(error=error).line(*spans)
+
+    def line(self, *spans):
+        self.blocks.append(('line', spans)); self._rendered.clear()
+        return self
+
+    def pre(self, rows):
+        self.blocks.append(('pre', list(rows))); self._rendered.clear()
+        return self
+
+    def extend(self, other):
+        if other: self.blocks.extend(other.blocks); self._rendered.clear()
+        return self
+
+    def __bool__(self):
+        return bool(self.blocks)
+
+    @staticmethod
+    def _escape_md(text):
+        return re.sub(r'([\\*_`~|\[\]])', r'\\\1', text)
+
+    @classmethod
+    def _span(cls, span, fmt):
+        if isinstance(span, str):
+            return html.escape(span, quote=False) if fmt == 'html' else cls._escape_md(span)
+        kind, *rest = span
+        if kind == 'code':
+            return f"<code>{html.escape(rest[0], quote=False)}</code>" if fmt == 'html' else f"`{rest[0]}`"
+        if kind == 'link':
+            url, *children = rest
+            inner = "".join(cls._span(c, fmt) for c in children)
+            return f"<a href='{html.escape(url)}'>{inner}</a>" if fmt == 'html' else f"[{inner}]({url})"
+        inner = "".join(cls._span(c, fmt) for c in rest)
+        return f"<{kind}>{inner}</{kind}>" if fmt == 'html' else f"{cls.MD_WRAP[kind]}{inner}{cls.MD_WRAP[kind]}"
+
+    @classmethod
+    def _plain(cls, span):
+        if isinstance(span, str): return span
+        kind, *rest = span
+        if kind == 'code': return rest[0]
+        return "".join(cls._plain(c) for c in (rest[1:] if kind == 'link' else rest))
+
+    def render(self, fmt='html'):
+        if fmt not in self._rendered:
+            out = []
+            for kind, body in self.blocks:
+                if kind == 'line':
+                    out.append("".join(self._span(sp, fmt) for sp in body))
+                elif fmt == 'html':
+                    out.append("<pre>" + "\n".join("".join(self._span(sp, fmt) for sp in row) for row in body) + "</pre>")
+                else:
+                    # 디스코드 코드 블록 안에서는 서식이 적용되지 않으므로 평문으로
+                    out.append("```\n" + "\n".join("".join(self._plain(sp) for sp in row) for row in body) + "\n```")
+            self._rendered[fmt] = "\n".join(out)
+        return self._rendered[fmt]
+
 # ================ [유틸리티] ================
 class Utils:
     @staticmethod
@@ -60,30 +877,25 @@ class Utils:
         return dt.strftime('%y.%m.%d %H:%M:%S')
 
     @staticmethod
-    async def fetch_json(url, headers=None, params=None):
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return None
-        except Exception as e:
-            print(f"API Error ({url}): {e}")
-            return None
+    async def fetch_json(url, headers=None, params=None, ttl=None, endpoint=None):
+        if not ttl: return await HttpClient.get_json(url, headers, params, endpoint)
+        key = ('json', url, tuple(sorted(params.items())) if params else ())
+        return await response_cache.get(key, lambda: HttpClient.get_json(url, headers, params, endpoint), ttl)
 
     @staticmethod
-    def html_to_discord(html_text):
-        text = html_text
-        text = text.replace('<b>', '**').replace('</b>', '**')
-        text = text.replace('<i>', '*').replace('</i>', '*')
-        text = text.replace('<u>', '__').replace('</u>', '__')
-        text = text.replace('<code>', '`').replace('</code>', '`')
-        text = text.replace('<pre>', '```\n').replace('</pre>', '\n```')
-        text = re.sub(r"<a href='([^']+)'>([^<]+)</a>", r"[\2](\1)", text)
-        return text
+    def ok(result):
+        """gather(return_exceptions=True) 결과에서 예외를 None 으로 변환"""
+        if isinstance(result, BaseException):
+            print(f"Task Error: {result!r}")
+            return None
+        return result
 
 # ================ [서비스 로직] ================
 class ValorantService:
+    @staticmethod
+    def is_tier1(m):
+        return m.get('team1', 'TBD') in Config.TIER1_TEAMS or m.get('team2', 'TBD') in Config.TIER1_TEAMS
+
     @staticmethod
     def get_current_league_path(region):
         now = Utils.get_kst_now()
@@ -108,35 +920,48 @@ class ValorantService:
         return f"{path_prefix}/Stage_2"
 
     @staticmethod
-    async def capture_bracket(league_path):
-        from playwright.async_api import async_playwright
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(viewport={'width': 5000, 'height': 2000}, color_scheme='dark')
-            page = await context.new_page()
-            url = f"https://liquipedia.net/valorant/{league_path}"
-            try:
-                await page.goto(url, wait_until="networkidle", timeout=30000)
-                bracket_selector = ".brkts-bracket"
+    async def capture_bracket(league_path, retry=True):
+        url = f"{Config.LIQUIPEDIA_BASE}/valorant/{league_path}"
+        bracket_selector = ".brkts-bracket"
+        try:
+            async with Metrics.track('dotori_capture', 'dotori_capture_errors_total'), BrowserPool.page() as page:
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
                 bracket = page.locator(bracket_selector).first
                 await bracket.wait_for(state="visible", timeout=10000)
                 await page.evaluate("""(sel) => {
                     const el = document.querySelector(sel);
                     if (el) { el.style.width = 'max-content'; el.style.maxWidth = 'none'; el.style.overflow = 'visible'; }
                 }""", bracket_selector)
-                await asyncio.sleep(2)
+                # 고정 대기 대신 대진표 안의 이미지/폰트 로딩 완료를 기다림
+                await page.wait_for_function("""(sel) => {
+                    const el = document.querySelector(sel);
+                    return !!el && document.fonts.status === 'loaded'
+                        && Array.from(el.querySelectorAll('img')).every(img => img.complete);
+                }""", arg=bracket_selector, timeout=10000)
                 img_bytes = await bracket.screenshot()
-                await browser.close()
                 return io.BytesIO(img_bytes)
-            except Exception as e:
-                print(f"Capture Error: {e}")
-                await browser.close()
-                return None
+        except Exception as e:
+            print(f"Capture Error: {e}")
+            # 브라우저가 죽은 경우 한 번만 재실행 후 재시도
+            if retry and not BrowserPool.is_alive():
+                return await ValorantService.capture_bracket(league_path, retry=False)
+            return None
 
     @staticmethod
     async def get_matches_message():
-        live_data = await Utils.fetch_json(Config.VAL_LIVE_URL) or {}
-        upcoming_data = await Utils.fetch_json(Config.VAL_MATCH_URL) or {}
+        return await response_cache.get(('msg', 'val'), ValorantService._build_matches_message, Config.CACHE_TTL_MESSAGE, 0)
+
+    @staticmethod
+    async def _build_matches_message():
+        live_data, upcoming_data = await asyncio.gather(
+            Utils.fetch_json(Config.VAL_LIVE_URL, ttl=Config.CACHE_TTL_LIVE, endpoint='vlr.live'),
+            Utils.fetch_json(Config.VAL_MATCH_URL, ttl=Config.CACHE_TTL_UPCOMING, endpoint='vlr.upcoming'),
+            return_exceptions=True
+        )
+        live_data, upcoming_data = Utils.ok(live_data), Utils.ok(upcoming_data)
+        # 둘 다 실패하면 '경기 없음' 이 아니라 장애이므로 오류로 (캐시되지 않음)
+        if live_data is None and upcoming_data is None: return Doc.text("❌ 경기 일정을 불러오지 못했습니다. 잠시 후 다시 시도해 주세요.", error=True)
+        live_data, upcoming_data = live_data or {}, upcoming_data or {}
         live_segments = live_data.get('data', {}).get('segments', [])
         upcoming_segments = upcoming_data.get('data', {}).get('segments', [])
         all_matches = []
@@ -144,7 +969,7 @@ class ValorantService:
 
         for m in live_segments:
             t1, t2 = m.get('team1', 'TBD'), m.get('team2', 'TBD')
-            if t1 not in Config.TIER1_TEAMS and t2 not in Config.TIER1_TEAMS: continue
+            if not ValorantService.is_tier1(m): continue
             event_name = m.get('match_event', '')
             region = "vct"
             if "Americas" in event_name: region += " americas"
@@ -155,13 +980,13 @@ class ValorantService:
             yt_link = f"https://www.youtube.com/results?search_query={search_query}"
             all_matches.append({
                 'event': event_name, 't1': t1, 't2': t2,
-                'status': f"<a href='{yt_link}'>{t1} vs {t2}</a> <b>(Live)</b>",
+                'status': (('link', yt_link, f"{t1} vs {t2}"), " ", ('b', "(Live)")),
                 'is_live': True, 'sort_key': 0
             })
 
         for m in upcoming_segments:
             t1, t2 = m.get('team1', 'TBD'), m.get('team2', 'TBD')
-            if t1 not in Config.TIER1_TEAMS and t2 not in Config.TIER1_TEAMS: continue
+            if not ValorantService.is_tier1(m): continue
             if m.get('unix_timestamp'):
                 try:
                     utc = datetime.strptime(m['unix_timestamp'], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
@@ -170,26 +995,27 @@ class ValorantService:
                     time_str = kst_match.strftime("%m.%d %H:%M")
                     all_matches.append({
                         'event': m.get('match_event', ''), 't1': t1, 't2': t2,
-                        'status': f"{t1} vs {t2} <i>({time_str})</i>",
+                        'status': (f"{t1} vs {t2} ", ('i', f"({time_str})")),
                         'is_live': False, 'sort_key': kst_match.timestamp()
                     })
                 except: continue
 
-        if not all_matches: return "🎮 <b>현재 진행 중이거나 예정된 1군 경기가 없습니다.</b>"
+        if not all_matches: return Doc.text("🎮 ", ('b', "현재 진행 중이거나 예정된 1군 경기가 없습니다."))
         all_matches.sort(key=lambda x: x['sort_key'])
-        msg, tournaments = "", {}
+        doc, tournaments = Doc(), {}
         for m in all_matches: tournaments.setdefault(m['event'], []).append(m)
         for event, m_list in tournaments.items():
-            msg += f"<b>[{event}]</b>\n"
-            for m in m_list: msg += f"{m['status']}\n"
-            msg += "\n"
-        return f"{msg}<code>#updated {Utils.format_timestamp()}</code>"
+            doc.line(('b', f"[{event}]"))
+            for m in m_list: doc.line(*m['status'])
+            doc.line()
+        return doc.line(('code', f"#updated {Utils.format_timestamp()}"))
 
     @staticmethod
     async def get_season_info():
-        data = await Utils.fetch_json(Config.VAL_SEASON_URL) or {}
+        try: data = await Utils.fetch_json(Config.VAL_SEASON_URL, ttl=Config.CACHE_TTL_SEASON, endpoint='valapi.season') or {}
+        except UpstreamError: return Doc()
         season_data = data.get('data', [])
-        if not season_data: return ""
+        if not season_data: return Doc()
         kst = timezone(timedelta(hours=9))
         offset = timedelta(hours=20, minutes=30)
         now = datetime.now(kst)
@@ -203,111 +1029,592 @@ class ValorantService:
         if future_dates:
             target = min(future_dates)
             rem = target - now
-            return f"시즌 종료까지: {rem.days}일 {rem.seconds//3600}시간 남음 (<code>{target.strftime('%Y-%m-%d')}</code> 종료)\n"
-        return "<b>예정된 시즌 종료일이 없습니다.</b>"
+            return Doc.text(f"시즌 종료까지: {rem.days}일 {rem.seconds//3600}시간 남음 (", ('code', target.strftime('%Y-%m-%d')), " 종료)")
+        return Doc.text(('b', "예정된 시즌 종료일이 없습니다."))
 
     @staticmethod
-    async def get_player_stats(name, tag):
-        headers = {"Authorization": Config.HENRIK_API_KEY, "Accept": "*/*"}
-        acc = await Utils.fetch_json(f"https://api.henrikdev.xyz/valorant/v1/account/{name}/{tag}", headers) or {}
+    async def get_account(name, tag, headers):
+        cached = await MatchStore.get_account(name, tag)
+        if cached: return cached
+        acc = await Utils.fetch_json(f"{Config.HENRIK_API_BASE}/valorant/v1/account/{name}/{tag}", headers, endpoint='henrik.account') or {}
         acc_data = acc.get('data', {})
-        if not acc_data: return f"❌ 계정({name}#{tag})을 찾을 수 없습니다."
+        if not acc_data: return None
         puuid, region = acc_data.get('puuid'), acc_data.get('region', 'kr')
-        tier_data = await Utils.fetch_json(f"https://api.henrikdev.xyz/valorant/v3/by-puuid/mmr/{region}/pc/{puuid}", headers) or {}
+        await MatchStore.save_account(name, tag, puuid, region)
+        return puuid, region
+
+    @staticmethod
+    async def get_recent_matches(name, tag, puuid, region, headers):
+        """저장된 경기 이후의 새 경기만 조회: size 1 로 먼저 확인해 이미 아는 경기면 중단, 아니면 전체 size 로 한 번 더"""
+        known = await MatchStore.recent_matches(puuid)
+        known_ids = {m['match_id'] for m in known}
+        steps = Config.MATCH_FETCH_STEPS if known else Config.MATCH_FETCH_STEPS[-1:]
+        for size in steps:
+            try: data = await Utils.fetch_json(f"{Config.HENRIK_API_BASE}/valorant/v3/matches/{region}/{name}/{tag}", headers, {"mode": "competitive", "size": size}, endpoint='henrik.matches')
+            except UpstreamError:
+                # 저장된 경기가 있으면 그것으로 응답, 없으면 '전적 없음' 대신 장애로 알림
+                if known: break
+                raise
+            if data is None: break
+            summaries = [x for x in (MatchStore.summarize(m, puuid) for m in data.get('data', [])) if x]
+            await MatchStore.save_matches(puuid, summaries)
+            if any(m['match_id'] in known_ids for m in summaries) or len(summaries) < size: break
+        return await MatchStore.recent_matches(puuid)
+
+    @staticmethod
+    async def get_rr_changes(puuid, region, headers):
+        """RR 변동 기록: 새로 받은 값은 저장, 조회 실패 시 저장된 값 사용 (둘 다 없으면 None)"""
+        try: mmr_hist = await Utils.fetch_json(f"{Config.HENRIK_API_BASE}/valorant/v2/by-puuid/mmr-history/{region}/pc/{puuid}", headers, endpoint='henrik.mmr_history')
+        except UpstreamError: mmr_hist = None
+        changes = await MatchStore.rr_changes(puuid)
+        if mmr_hist:
+            fresh = {i['match_id']: i.get('last_change', 0) for i in mmr_hist.get('data', {}).get('history', [])}
+            await MatchStore.save_rr_changes(puuid, fresh)
+            changes.update(fresh)
+        return changes if (mmr_hist or changes) else None
+
+    @staticmethod
+    async def get_player_stats(name, tag):
+        """같은 플레이어의 결과는 텔레그램/디스코드가 잠시 공유 (렌더링 결과도 Doc 에 캐시됨)"""
+        key = ('stat', name.lower(), tag.lower())
+        return await response_cache.get(key, lambda: ValorantService._build_player_stats(name, tag), Config.CACHE_TTL_STAT, 0)
+
+    @staticmethod
+    async def _build_player_stats(name, tag):
+        headers = {"Authorization": Config.HENRIK_API_KEY, "Accept": "*/*"}
+        # 시즌 정보는 계정과 무관하므로 계정 조회와 동시에 시작
+        season_task = asyncio.create_task(ValorantService.get_season_info())
+        try: account = await ValorantService.get_account(name, tag, headers)
+        except UpstreamError:
+            season_task.cancel()
+            return ValorantService.upstream_busy(name, tag)
+        if not account:
+            season_task.cancel()
+            return Doc.text(f"❌ 계정({name}#{tag})을 찾을 수 없습니다.", error=True)
+        puuid, region = account
+        # 계정 이후 요청들은 서로 독립적이므로 병렬로 조회 (일부 실패는 None 으로 처리)
+        tier_data, mmr_map, match_list, season = await asyncio.gather(
+            Utils.fetch_json(f"{Config.HENRIK_API_BASE}/valorant/v3/by-puuid/mmr/{region}/pc/{puuid}", headers, endpoint='henrik.mmr'),
+            ValorantService.get_rr_changes(puuid, region, headers),
+            ValorantService.get_recent_matches(name, tag, puuid, region, headers),
+            season_task, return_exceptions=True
+        )
+        tier_data = Utils.ok(tier_data) or {}
+        if not isinstance(match_list, UpstreamError): match_list = Utils.ok(match_list) or []
+        season = Utils.ok(season) or Doc()
         curr_info = tier_data.get('data', {}).get('current', {})
         tier_str = curr_info.get('tier', {}).get('name', 'None')
         curr_rr = curr_info.get('rr', 'None')
-        mmr_hist = await Utils.fetch_json(f"https://api.henrikdev.xyz/valorant/v2/by-puuid/mmr-history/{region}/pc/{puuid}", headers) or {}
-        mmr_map = {i['match_id']: i.get('last_change', 0) for i in mmr_hist.get('data', {}).get('history', [])}
-        matches = await Utils.fetch_json(f"https://api.henrikdev.xyz/valorant/v3/matches/{region}/{name}/{tag}", headers, {"mode": "competitive", "size": 10}) or {}
-        match_list = matches.get('data', [])
-        if not match_list: return f"❌ {name}#{tag}의 최근 전적이 없습니다."
+        # MMR 기록을 못 가져오면 RR 칸은 비워둠
+        mmr_map = Utils.ok(mmr_map)
+        if isinstance(match_list, UpstreamError): return ValorantService.upstream_busy(name, tag)
+        if not match_list: return Doc.text(f"❌ {name}#{tag}의 최근 전적이 없습니다.", error=True)
         lines, tk, td, ts, tr = [], 0, 0, 0, 0
         for m in match_list:
-            meta = m.get('metadata')
-            if not meta or meta.get('game_start', 0) == 0: continue
-            m_time = datetime.fromtimestamp(meta['game_start'], tz=pytz.timezone('Asia/Seoul'))
+            m_time = datetime.fromtimestamp(m['game_start'], tz=pytz.timezone('Asia/Seoul'))
             date_str = m_time.strftime("%m.%d %I:%M%p").lower()
-            me = next((p for p in m.get('players', {}).get('all_players', []) if p['puuid'] == puuid), None)
-            if not me: continue
-            st = me.get('stats', {})
-            tk += st.get('kills', 0); td += st.get('deaths', 0); ts += st.get('score', 0); tr += meta.get('rounds_played', 1)
-            teams = m.get('teams', {})
-            if me['team'].lower() in teams:
-                tm = teams[me['team'].lower()]
-                res = "승리" if tm.get('has_won') else ("무승부" if tm.get('rounds_won') == tm.get('rounds_lost') else "패배")
-                rr = mmr_map.get(meta.get('matchid'), 0)
-                rr_str = f"+{rr}" if rr > 0 else str(rr)
-                lines.append(f"{res}  [{st.get('kills')}/{st.get('deaths')}/{st.get('assists')}]  {meta.get('map')}  ({date_str})  <code>{rr_str}</code>")
+            tk += m['kills']; td += m['deaths']; ts += m['score']; tr += m['rounds']
+            if m['result']:
+                row = [f"{m['result']}  [{m['kills']}/{m['deaths']}/{m['assists']}]  {m['map']}  ({date_str})"]
+                if mmr_map is not None:
+                    rr = mmr_map.get(m['match_id'], 0)
+                    row += ["  ", ('code', f"{'+' if rr > 0 else ''}{rr}")]
+                lines.append(row)
         kd = tk / td if td else tk
         acs = int(ts / tr) if tr else 0
         url = f"https://tracker.gg/valorant/profile/riot/{urllib.parse.quote(name)}%23{urllib.parse.quote(tag)}/overview"
-        msg = f"🐿️ <b><a href='{url}'>{name}#{tag}</a> 최근 10판!</b>\n서버 : {region}\nK/D : <b>{kd:.2f}</b>  |  ACS : <b>{acs}</b>\n현재티어 : <b>{tier_str},  {curr_rr}</b>\n"
-        msg += "----------------------------------------------\n<pre>" + "\n".join(lines) + "</pre>\n"
-        season = await ValorantService.get_season_info()
-        return msg + season + f"\n<code>#updated {Utils.format_timestamp()}</code>"
+        doc = Doc().line("🐿️ ", ('b', ('link', url, f"{name}#{tag}"), " 최근 10판!"))
+        doc.line(f"서버 : {region}")
+        doc.line("K/D : ", ('b', f"{kd:.2f}"), "  |  ACS : ", ('b', str(acs)))
+        doc.line("현재티어 : ", ('b', f"{tier_str},  {curr_rr}"))
+        doc.line("----------------------------------------------").pre(lines)
+        doc.extend(season)
+        return doc.line().line(('code', f"#updated {Utils.format_timestamp()}"))
+
+    @staticmethod
+    def upstream_busy(name, tag):
+        return Doc.text(f"⏳ {name}#{tag}: 전적 서버가 응답하지 않습니다. 잠시 후 다시 시도해 주세요.", error=True)
+
+    _stat_sem = None
+
+    @staticmethod
+    def parse_players(text):
+        """'닉네임#태그 닉네임#태그' -> [(name, tag)], 형식이 틀린 항목은 tag=None
+        닉네임에는 띄어쓰기가 들어갈 수 있고 태그에는 없으므로 '#태그' 뒤에서 끊음 (예: 'Hide on bush#KR1 abc#kr')"""
+        players = []
+        for tok in re.findall(r'\s*([^#\s][^#]*?#\S*|\S+)', text):
+            name, sep, tag = tok.rpartition('#')
+            name = name.strip()
+            players.append((name, tag) if sep and name and tag else (tok, None))
+        return players
+
+    @staticmethod
+    async def iter_players_stats(players):
+        """여러 플레이어를 동시 조회 (전역 동시성 제한), 끝나는 순서대로 (index, 결과) 반환"""
+        if ValorantService._stat_sem is None:
+            ValorantService._stat_sem = asyncio.Semaphore(Config.STAT_CONCURRENCY)
+        sem = ValorantService._stat_sem
+
+        async def one(i, name, tag):
+            if tag is None: return i, Doc.text(f"❌ 형식: 닉네임#태그 ({name})", error=True)
+            async with sem:
+                try: return i, await ValorantService.get_player_stats(name, tag)
+                except Exception as e:
+                    print(f"Stat Error ({name}#{tag}): {e}")
+                    return i, Doc.text(f"❌ {name}#{tag} 조회 중 오류가 발생했습니다.", error=True)
+
+        tasks = [asyncio.create_task(one(i, *p)) for i, p in enumerate(players)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks: t.cancel()
 
 class LolService:
+    # match_id -> (kst_time, league, t1, t2, bo, signature)
+    _events = {}
+    _sorted = []
+    _dirty = False
+    _covered_until = {}
+    _loaded_at = None
+    _refreshing = None
+
+    @classmethod
+    def _merge(cls, lname, events):
+        """이벤트를 match id 기준으로 병합, 바뀌지 않은 이벤트는 다시 파싱하지 않음. 페이지의 마지막 경기 시각 반환"""
+        last = None
+        for evt in events:
+            match = evt.get('match') or {}
+            mid = match.get('id')
+            if not mid or not evt.get('startTime'): continue
+            teams = match.get('teams', [])
+            sig = (evt['startTime'], tuple(t.get('code') for t in teams))
+            old = cls._events.get(mid)
+            if old and old[5] == sig:
+                last = old[0]; continue
+            try:
+                utc = datetime.fromisoformat(evt['startTime'].replace('Z', '+00:00')).replace(tzinfo=pytz.utc)
+                kst_match = utc.astimezone(pytz.timezone('Asia/Seoul'))
+                last = kst_match
+                if len(teams) < 2: continue
+                t1, t2 = teams[0].get('code'), teams[1].get('code')
+                cls._events[mid] = (kst_match, lname, t1, t2, match['strategy']['count'], sig)
+                cls._dirty = True
+            except: continue
+        return last
+
+    @classmethod
+    async def _fetch_league(cls, lname, lid, horizon):
+        """리그 일정 갱신, 첫 페이지라도 받았으면 True"""
+        headers = {"x-api-key": Config.LOL_API_KEY}
+        params = {"hl": "en-US", "leagueId": lid}
+        # 기본 페이지는 항상 갱신하고, 아직 범위를 못 채운 경우에만 newer 토큰을 따라감
+        for page in range(Config.LOL_MAX_PAGES):
+            data = await Utils.fetch_json(Config.LOL_SCHEDULE_URL, headers, params, endpoint='lolesports.schedule')
+            if not data:
+                if page == 0: print(f"LoL Schedule Error ({lname}): empty response")
+                return page > 0
+            schedule = data.get('data', {}).get('schedule', {})
+            last = cls._merge(lname, schedule.get('events', []))
+            if last: cls._covered_until[lid] = max(last, cls._covered_until.get(lid, last))
+            token = (schedule.get('pages') or {}).get('newer')
+            if not token or cls._covered_until.get(lid, horizon) >= horizon: return True
+            params = {"hl": "en-US", "leagueId": lid, "pageToken": token}
+        return True
+
+    @classmethod
+    async def refresh(cls):
+        now_kst = Utils.get_kst_now()
+        horizon = now_kst + timedelta(days=Config.LOL_WINDOW_DAYS)
+        results = await asyncio.gather(*(cls._fetch_league(lname, lid, horizon) for lname, lid in Config.LOL_LEAGUES.items()), return_exceptions=True)
+        ok = [Utils.ok(r) for r in results]
+        # 지난 경기 정리
+        cutoff = now_kst - timedelta(days=1)
+        for mid in [mid for mid, e in cls._events.items() if e[0] < cutoff]:
+            del cls._events[mid]; cls._dirty = True
+        if cls._dirty:
+            cls._sorted = sorted(cls._events.values(), key=lambda e: (e[0], e[1], e[2], e[3]))
+            cls._dirty = False
+        # 모든 리그가 실패하면 갱신 시각을 남기지 않아 다음 요청에서 바로 다시 시도
+        if any(ok): cls._loaded_at = time.monotonic()
+
+    @classmethod
+    async def ensure_fresh(cls):
+        """최초 1회는 기다리고, 이후에는 메모리의 일정을 바로 쓰면서 뒤에서 갱신"""
+        if cls._refreshing is None or cls._refreshing.done():
+            if cls._loaded_at is None or time.monotonic() - cls._loaded_at > Config.LOL_REFRESH_INTERVAL:
+                cls._refreshing = asyncio.create_task(cls.refresh())
+        if cls._loaded_at is None and cls._refreshing: await asyncio.shield(cls._refreshing)
+
     @staticmethod
     async def get_matches_message():
-        headers = {"x-api-key": Config.LOL_API_KEY}
-        matches = []
+        return await response_cache.get(('msg', 'lol'), LolService._build_matches_message, Config.CACHE_TTL_MESSAGE, 0)
+
+    @staticmethod
+    async def _build_matches_message():
+        await LolService.ensure_fresh()
+        # 한 번도 받아오지 못했으면 '경기 없음' 대신 오류로 (캐시되지 않음)
+        if LolService._loaded_at is None: return Doc.text("❌ 롤 일정을 불러오지 못했습니다. 잠시 후 다시 시도해 주세요.", error=True)
         now_kst = Utils.get_kst_now()
         today_date = now_kst.date()
         start_of_today = now_kst.replace(hour=0, minute=0, second=0, microsecond=0)
-        limit_date = now_kst + timedelta(days=10)
-        async with aiohttp.ClientSession() as session:
-            for lname, lid in Config.LOL_LEAGUES.items():
-                url = f"https://esports-api.lolesports.com/persisted/gw/getSchedule?hl=en-US&leagueId={lid}"
-                data = await Utils.fetch_json(url, headers) or {}
-                schedule = data.get('data', {}).get('schedule', {}).get('events', [])
-                for evt in schedule:
-                    if not evt.get('startTime'): continue
-                    try:
-                        utc = datetime.fromisoformat(evt['startTime'].replace('Z', '+00:00')).replace(tzinfo=pytz.utc)
-                        kst_match = utc.astimezone(pytz.timezone('Asia/Seoul'))
-                        if start_of_today < kst_match < limit_date:
-                            teams = evt.get('match', {}).get('teams', [])
-                            if len(teams) >= 2:
-                                t1, t2 = teams[0].get('code'), teams[1].get('code')
-                                if t1 != "TBD" and t2 != "TBD":
-                                    is_today = (kst_match.date() == today_date)
-                                    matches.append((kst_match, lname, f"{t1} vs {t2}", evt['match']['strategy']['count'], is_today))
-                    except: continue
-        if not matches: return "⚔️ <b>예정된 경기가 없습니다.</b>"
-        matches.sort()
-        msg, cur_league = "", ""
-        for m_time, league, title, bo, is_today in matches:
+        limit_date = now_kst + timedelta(days=Config.LOL_WINDOW_DAYS)
+        matches = [e for e in LolService._sorted if start_of_today < e[0] < limit_date and e[2] != "TBD" and e[3] != "TBD"]
+        if not matches: return Doc.text("⚔️ ", ('b', "예정된 경기가 없습니다."))
+        doc, cur_league = Doc(), ""
+        for m_time, league, t1, t2, bo, _ in matches:
             d_name = f"{league} {now_kst.year}"
             if d_name != cur_league:
-                if cur_league: msg += "\n"
-                msg += f"<b>[{d_name}]</b>\n"
+                if cur_league: doc.line()
+                doc.line(('b', f"[{d_name}]"))
                 cur_league = d_name
             time_str = m_time.strftime('%m.%d %H:%M')
-            line = f"{title} <b>(Bo{bo})</b> <i>({time_str})</i>"
-            if is_today: line = f"<u>{line}</u>"
-            msg += line + "\n"
-        return f"{msg}\n<code>#updated {Utils.format_timestamp()}</code>"
+            line = (f"{t1} vs {t2} ", ('b', f"(Bo{bo})"), " ", ('i', f"({time_str})"))
+            if m_time.date() == today_date: line = (('u', *line),)
+            doc.line(*line)
+        return doc.line().line(('code', f"#updated {Utils.format_timestamp()}"))
+
+# ================ [대진표 캐시] ================
+class BracketCache:
+    """league_path -> {'bytes', 'hash', 'rendered_at', 'file_id'}
+    만료된 항목은 그대로 응답하고 뒤에서 다시 렌더링 (stale-while-revalidate)"""
+    _entries = {}
+    _inflight = {}
+    _task = None
+
+    @classmethod
+    def is_stale(cls, entry):
+        return time.monotonic() - entry['rendered_at'] > Config.BRACKET_REFRESH_INTERVAL
+
+    @classmethod
+    def refresh(cls, league_path):
+        """같은 경로의 렌더링은 동시에 하나만 수행"""
+        task = cls._inflight.get(league_path)
+        if task is None:
+            task = asyncio.create_task(cls._render(league_path))
+            cls._inflight[league_path] = task
+            task.add_done_callback(lambda _: cls._inflight.pop(league_path, None))
+        return task
+
+    @classmethod
+    async def _render(cls, league_path):
+        photo = await ValorantService.capture_bracket(league_path)
+        if not photo: return cls._entries.get(league_path)
+        data = await ImageProcessor.run(photo.getvalue())
+        digest = hashlib.sha256(data).hexdigest()
+        old = cls._entries.get(league_path)
+        # 이미지가 바뀌지 않았다면 기존 file_id 재사용
+        file_id = old['file_id'] if old and old['hash'] == digest else None
+        entry = {'bytes': data, 'hash': digest, 'rendered_at': time.monotonic(), 'file_id': file_id}
+        cls._entries[league_path] = entry
+        return entry
+
+    @classmethod
+    async def get(cls, league_path):
+        entry = cls._entries.get(league_path)
+        if entry is None: return await asyncio.shield(cls.refresh(league_path))
+        if cls.is_stale(entry): cls.refresh(league_path)
+        return entry
+
+    @classmethod
+    def peek(cls, league_path):
+        return cls._entries.get(league_path)
+
+    @classmethod
+    def set_file_id(cls, league_path, digest, file_id):
+        entry = cls._entries.get(league_path)
+        if entry and entry['hash'] == digest: entry['file_id'] = file_id
+
+    @classmethod
+    async def _scheduler(cls):
+        while True:
+            for region in Config.VCT_REGIONS:
+                league_path = ValorantService.get_current_league_path(region)
+                entry = cls._entries.get(league_path)
+                if entry is None or cls.is_stale(entry):
+                    try: await cls.refresh(league_path)
+                    except Exception as e: print(f"Bracket Refresh Error ({league_path}): {e}")
+            await asyncio.sleep(Config.BRACKET_REFRESH_INTERVAL / 4)
+
+    @classmethod
+    def start(cls):
+        if cls._task is None: cls._task = asyncio.create_task(cls._scheduler())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try: await cls._task
+            except asyncio.CancelledError: pass
+            cls._task = None
+
+# ================ [라이브 알림] ================
+class Broadcaster:
+    """전송 대기열: 채팅별 순서와 간격, 전체 전송 속도를 지키고 flood-wait(RetryAfter) 시 기다렸다가 재전송"""
+    _send = None
+    _task = None
+    _wake = None
+    _limiter = RateLimiter(Config.TG_GLOBAL_RATE, 1)
+    _pending = {}        # chat_id -> deque[(text, tries)]
+    _ready = []          # heap[(보낼 수 있는 시각, chat_id)]
+    _next_allowed = {}
+
+    @classmethod
+    def start(cls, send):
+        cls._send = send
+        if cls._wake is None: cls._wake = asyncio.Event()
+        if cls._task is None: cls._task = asyncio.create_task(cls._worker())
+
+    @classmethod
+    def publish(cls, text, chat_ids):
+        if cls._wake is None: return
+        for cid in chat_ids:
+            dq = cls._pending.setdefault(cid, deque())
+            if not dq: heapq.heappush(cls._ready, (cls._next_allowed.get(cid, 0), cid))
+            dq.append((text, 0))
+        cls._wake.set()
+
+    @classmethod
+    async def _sleep(cls, timeout):
+        cls._wake.clear()
+        try: await asyncio.wait_for(cls._wake.wait(), timeout)
+        except asyncio.TimeoutError: pass
+
+    @classmethod
+    async def _worker(cls):
+        while True:
+            if not cls._ready:
+                await cls._sleep(None); continue
+            at, cid = cls._ready[0]
+            delay = at - time.monotonic()
+            if delay > 0:
+                await cls._sleep(delay); continue
+            heapq.heappop(cls._ready)
+            # 예상 못 한 오류 하나로 워커가 죽어 이후 알림이 모두 멈추지 않도록
+            try: await cls._send_next(cid)
+            except Exception as e: print(f"Broadcast Worker Error ({cid}): {e!r}")
+
+    @classmethod
+    async def _send_next(cls, cid):
+        from telegram.error import RetryAfter, Forbidden
+        dq = cls._pending.get(cid)
+        if not dq: return    # 이미 비워진 채팅의 남은 heap 항목
+        text, tries = dq[0]
+        await cls._limiter.acquire()
+        cls._next_allowed[cid] = time.monotonic() + Config.TG_CHAT_INTERVAL
+        try:
+            await cls._send(cid, text)
+            dq.popleft()
+        except RetryAfter as e:
+            wait = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            cls._limiter.block(wait)
+            cls._next_allowed[cid] = time.monotonic() + wait
+            if tries < Config.TG_MAX_SEND_RETRIES: dq[0] = (text, tries + 1)
+            else: dq.popleft()
+        except Forbidden:
+            # 봇이 내보내졌거나 차단된 채팅은 구독 해제 (await 중 publish 가 새 대기열을 만들 수 있으므로 먼저 정리)
+            dq.clear()
+            if cls._pending.get(cid) is dq: del cls._pending[cid]
+            await ChatRegistry.set_subscribed(cid, False)
+            return
+        except Exception as e:
+            print(f"Broadcast Error ({cid}): {e}")
+            dq.popleft()
+        if dq: heapq.heappush(cls._ready, (cls._next_allowed[cid], cid))
+        elif cls._pending.get(cid) is dq: del cls._pending[cid]
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try: await cls._task
+            except asyncio.CancelledError: pass
+            cls._task = None
+
+class LiveWatcher:
+    """라이브 스코어를 한 곳에서 주기적으로 조회하고, 이전 스냅샷과 비교해 바뀐 내용만 구독 채팅에 전송"""
+    _snapshot = None
+    _missing = {}        # 목록에서 빠진 경기 key -> 연속으로 빠진 횟수
+    _task = None
+
+    @staticmethod
+    def _key(m):
+        return (m.get('match_event', ''), m.get('team1', 'TBD'), m.get('team2', 'TBD'))
+
+    @staticmethod
+    def _maps(m):
+        try: return int(m.get('score1') or 0), int(m.get('score2') or 0)
+        except ValueError: return 0, 0
+
+    @staticmethod
+    def _completed_ago(seg):
+        """vlrggapi 결과의 time_completed ('1h 32m ago') -> 초, 해석 못 하면 None"""
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+        parts = re.findall(r'(\d+)\s*([a-z]+)', seg.get('time_completed', '').lower())
+        if not parts or any(u not in units for _, u in parts): return None
+        return sum(int(n) * units[u] for n, u in parts)
+
+    @classmethod
+    def _results(cls, data):
+        """최근 종료된 경기: (team1, team2) -> (score1, score2), 팀 순서가 바뀌어도 찾을 수 있게 양방향 저장"""
+        finals = {}
+        for seg in (data or {}).get('data', {}).get('segments', []):
+            ago = cls._completed_ago(seg)
+            if ago is None or ago > Config.LIVE_RESULT_MAX_AGE: continue
+            t1, t2 = seg.get('team1'), seg.get('team2')
+            s1, s2 = cls._maps(seg)
+            finals.setdefault((t1, t2), (s1, s2)); finals.setdefault((t2, t1), (s2, s1))
+        return finals
+
+    @classmethod
+    def diff(cls, old, new, ended=None):
+        """old/new: 스냅샷, ended: 종료가 확인된 경기 key -> 최종 스코어 (모르면 None)"""
+        events = []
+        for key, m in new.items():
+            event, t1, t2 = key
+            s1, s2 = cls._maps(m)
+            if key not in old:
+                events.append(Doc().line("🔴 ", ('b', f"[{event}]")).line(f"{t1} vs {t2} 경기 시작!"))
+            elif (s1, s2) != cls._maps(old[key]):
+                map_name = old[key].get('current_map') or '맵'
+                events.append(Doc().line("🗺️ ", ('b', f"[{event}]")).line(f"{map_name} 종료 - {t1} ", ('b', f"{s1} : {s2}"), f" {t2}"))
+        for key, final in (ended or {}).items():
+            event, t1, t2 = key
+            doc = Doc().line("🏁 ", ('b', f"[{event}]"))
+            events.append(doc.line(f"경기 종료 - {t1} ", ('b', f"{final[0]} : {final[1]}"), f" {t2}") if final else doc.line(f"{t1} vs {t2} 경기 종료"))
+        return events
+
+    @classmethod
+    async def poll(cls):
+        try: data = await Utils.fetch_json(Config.VAL_LIVE_URL, ttl=Config.CACHE_TTL_LIVE, endpoint='vlr.live')
+        except UpstreamError: return
+        if data is None: return
+        segments = data.get('data', {}).get('segments', [])
+        current = {cls._key(m): m for m in segments if ValorantService.is_tier1(m)}
+        # 목록에서 빠진 경기는 결과 목록에 뜨거나 여러 번 연속으로 빠졌을 때만 종료 처리 (빈 응답 한 번으로 종료/재시작 알림이 반복되지 않게)
+        previous = cls._snapshot or {}
+        missing = [key for key in previous if key not in current]
+        for key in current: cls._missing.pop(key, None)
+        ended = {}
+        if missing:
+            try: finals = cls._results(await Utils.fetch_json(Config.VAL_RESULTS_URL, ttl=Config.CACHE_TTL_LIVE, endpoint='vlr.results'))
+            except UpstreamError: finals = {}
+            for key in missing:
+                cls._missing[key] = cls._missing.get(key, 0) + 1
+                final = finals.get(key[1:])
+                if final or cls._missing[key] >= Config.LIVE_END_POLLS:
+                    ended[key] = final; cls._missing.pop(key)
+        # 첫 조회는 기준점만 잡고 알림은 보내지 않음 (재시작 시 중복 알림 방지)
+        if cls._snapshot is not None and ChatRegistry.subscribers():
+            for doc in cls.diff(previous, current, ended):
+                Broadcaster.publish(doc.render('html'), list(ChatRegistry.subscribers()))
+        cls._snapshot = {**{key: previous[key] for key in missing if key not in ended}, **current}
+
+    @classmethod
+    async def _loop(cls):
+        request_priority.set(BACKGROUND)
+        while True:
+            try: await cls.poll()
+            except Exception as e: print(f"Live Watch Error: {e}")
+            await asyncio.sleep(Config.LIVE_POLL_INTERVAL)
+
+    @classmethod
+    def start(cls):
+        if cls._task is None: cls._task = asyncio.create_task(cls._loop())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            try: await cls._task
+            except asyncio.CancelledError: pass
+            cls._task = None
 
 # ================ [메인 봇 및 핸들러] ================
-intents = discord.Intents.default(); intents.message_content = True; intents.members = True; intents.voice_states = True
-client = discord.Client(intents=intents); tree = app_commands.CommandTree(client)
-telegram_app = None; telegram_chats = {"chats": {}}
+client = None; telegram_app = None
 
-def save_chats():
-    with open(Config.TELEGRAM_CHATS_FILE, 'w', encoding='utf-8') as f: json.dump(telegram_chats, f, ensure_ascii=False, indent=4)
-def load_chats():
-    try:
-        with open(Config.TELEGRAM_CHATS_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-    except: return {"chats": {}}
+class StreamedReply:
+    """조각난 결과를 메시지 길이 제한에 맞춰 나눠 보내고, 조각이 갱신될 때마다 해당 메시지만 수정.
+    수정은 STREAM_EDIT_INTERVAL 마다 최신 상태 한 번으로 모으고, flood-wait 는 기다렸다가 다시 시도"""
+    def __init__(self, send, edit, delete, limit, sep="\n\n"):
+        self.send, self.edit, self.delete, self.limit, self.sep = send, edit, delete, limit, sep
+        self.messages, self.texts = [], []
+        self.lock = asyncio.Lock()
+        self.pending, self.synced_at, self.timer = None, 0, None
+
+    def pack(self, parts):
+        chunks, cur = [], ""
+        for part in parts:
+            if cur and len(cur) + len(self.sep) + len(part) > self.limit:
+                chunks.append(cur); cur = part
+            else:
+                cur = f"{cur}{self.sep}{part}" if cur else part
+        if cur: chunks.append(cur)
+        return chunks
+
+    async def update(self, parts, force=False):
+        """parts 는 항상 전체 상태. 간격 안의 갱신은 마지막 것만 남겨 뒤에서 한 번에 반영 (force 면 즉시)"""
+        self.pending = parts
+        wait = self.synced_at + Config.STREAM_EDIT_INTERVAL - time.monotonic()
+        if force or wait <= 0:
+            # 아직 대기 중인 예약만 취소 (전송 중인 작업은 _later 가 timer 를 비운 뒤라 건드리지 않음)
+            if self.timer: self.timer.cancel(); self.timer = None
+            await self._sync()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._later(wait))
+
+    async def _later(self, wait):
+        await asyncio.sleep(wait)
+        self.timer = None
+        try: await self._sync()
+        except Exception as e: print(f"Stream Reply Error: {e!r}")
+
+    @staticmethod
+    async def _call(op, fn, *args):
+        for attempt in range(Config.STREAM_MAX_RETRIES + 1):
+            try:
+                async with Metrics.track('dotori_platform', op=op):
+                    return await fn(*args)
+            except Exception as e:
+                # 텔레그램 RetryAfter (디스코드는 라이브러리가 직접 대기)
+                wait = getattr(e, 'retry_after', None)
+                if wait is None or attempt >= Config.STREAM_MAX_RETRIES: raise
+                await asyncio.sleep(wait.total_seconds() if isinstance(wait, timedelta) else float(wait))
+
+    async def _sync(self):
+        async with self.lock:
+            parts, self.pending = self.pending, None
+            if parts is None: return
+            chunks = self.pack(parts)
+            for i, text in enumerate(chunks):
+                if i >= len(self.messages):
+                    self.messages.append(await self._call('send', self.send, text)); self.texts.append(text)
+                elif self.texts[i] != text:
+                    await self._call('edit', self.edit, self.messages[i], text); self.texts[i] = text
+            while len(self.messages) > len(chunks):
+                await self._call('delete', self.delete, self.messages.pop()); self.texts.pop()
+            self.synced_at = time.monotonic()
+
+async def stream_player_stats(players, reply, fmt='html'):
+    # 최대 인원을 넘으면 잘라내고, 잘린 사실을 마지막 조각으로 알림
+    dropped = len(players) - Config.STAT_MAX_PLAYERS
+    players = players[:Config.STAT_MAX_PLAYERS]
+    note = Doc.text(f"ℹ️ 한 번에 최대 {Config.STAT_MAX_PLAYERS}명까지 조회합니다. ({dropped}명 제외)").render(fmt) if dropped > 0 else ""
+    parts = [Doc.text("🔍 ", ('b', f"{name}#{tag}"), " 검색 중...").render(fmt) if tag else "" for name, tag in players]
+    await reply.update([p for p in parts + [note] if p])
+    async for i, res in ValorantService.iter_players_stats(players):
+        parts[i] = res.render(fmt)
+        await reply.update([p for p in parts + [note] if p])
+    # 모아둔 마지막 상태를 바로 반영
+    await reply.update([p for p in parts + [note] if p], force=True)
 
 # 텔레그램 핸들러
 async def tg_register(update):
     if update.effective_chat:
         cid = str(update.effective_chat.id); name = update.effective_chat.title or update.effective_chat.first_name or '개인 채팅'
-        if cid not in telegram_chats["chats"] or telegram_chats["chats"][cid]['name'] != name:
-            telegram_chats["chats"][cid] = {'name': name}; save_chats()
+        ChatRegistry.register(cid, name)
 
+@Metrics.instrument('help')
 async def cmd_help(update, context):
     """텔레그램 도움말"""
     await tg_register(update)
@@ -316,97 +1623,229 @@ async def cmd_help(update, context):
         "/val - 발로란트 대회 일정\n"
         "/vct - VCT 대진표 이미지 조회\n"
         "/lol - 롤 대회 일정 조회\n"
-        "/stat [닉네임#태그] - 발로란트 전적 검색\n"
+        "/stat [닉네임#태그 ...] - 발로란트 전적 검색 (띄어쓰기로 여러 명)\n"
+        "/live - 발로란트 라이브 스코어 알림 켜기/끄기\n"
     )
     await context.bot.send_message(update.effective_chat.id, help_text, parse_mode='HTML')
 
+@Metrics.instrument('vct')
 async def cmd_vct(update, context):
     await tg_register(update)
-    keyboard = [
-        [InlineKeyboardButton("Pacific", callback_data="vct_Pacific"), InlineKeyboardButton("Americas", callback_data="vct_Americas")],
-        [InlineKeyboardButton("EMEA", callback_data="vct_EMEA"), InlineKeyboardButton("China", callback_data="vct_China")],
-        [InlineKeyboardButton("Masters/Champions", callback_data="vct_Masters/Champions")]
-    ]
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    buttons = [InlineKeyboardButton(r, callback_data=f"vct_{r}") for r in Config.VCT_REGIONS]
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
     await context.bot.send_message(update.effective_chat.id, "🏆 VCT 대진표 조회\n현재 시즌의 대진표를 가져옵니다.", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
 
+@Metrics.instrument('val')
 async def cmd_val(update, context):
-    await tg_register(update); await context.bot.send_message(update.effective_chat.id, await ValorantService.get_matches_message(), parse_mode='HTML', disable_web_page_preview=True)
+    await tg_register(update); await context.bot.send_message(update.effective_chat.id, (await ValorantService.get_matches_message()).render('html'), parse_mode='HTML', disable_web_page_preview=True)
 
+@Metrics.instrument('lol')
 async def cmd_lol(update, context):
-    await tg_register(update); await context.bot.send_message(update.effective_chat.id, await LolService.get_matches_message(), parse_mode='HTML', disable_web_page_preview=True)
+    await tg_register(update); await context.bot.send_message(update.effective_chat.id, (await LolService.get_matches_message()).render('html'), parse_mode='HTML', disable_web_page_preview=True)
 
+@Metrics.instrument('stat')
 async def cmd_stat(update, context):
     await tg_register(update)
-    if not context.args: return await context.bot.send_message(update.effective_chat.id, "❌ /stat lissa#vlr")
+    chat_id = update.effective_chat.id
+    if not context.args: return await context.bot.send_message(chat_id, "❌ /stat lissa#vlr")
+    reply = StreamedReply(
+        send=lambda text: context.bot.send_message(chat_id, text, parse_mode='HTML', disable_web_page_preview=True),
+        edit=lambda msg, text: context.bot.edit_message_text(chat_id=chat_id, message_id=msg.message_id, text=text, parse_mode='HTML', disable_web_page_preview=True),
+        delete=lambda msg: msg.delete(), limit=Config.TELEGRAM_MSG_LIMIT
+    )
     try:
-        name, tag = context.args[0].split('#')
-        msg = await context.bot.send_message(update.effective_chat.id, f"🔍 <b>{name}#{tag}</b> 검색 중...", parse_mode='HTML')
-        res = await ValorantService.get_player_stats(name, tag)
-        await context.bot.edit_message_text(chat_id=update.effective_chat.id, message_id=msg.message_id, text=res, parse_mode='HTML', disable_web_page_preview=True)
-    except:
-        await context.bot.send_message(update.effective_chat.id, "❌ 형식: /stat 사용자#태그")
+        await stream_player_stats(ValorantService.parse_players(" ".join(context.args)), reply)
+    except Exception as e:
+        # 예외를 여기서 삼키므로 instrument 대신 직접 오류 수를 올림
+        Metrics.inc('dotori_command_errors_total', command='stat')
+        print(f"Telegram Stat Error: {e}")
+        await context.bot.send_message(chat_id, "❌ 전적 조회 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.")
 
+@Metrics.instrument('live')
+async def cmd_live(update, context):
+    await tg_register(update)
+    cid = str(update.effective_chat.id)
+    on = cid not in ChatRegistry.subscribers()
+    await ChatRegistry.set_subscribed(cid, on)
+    text = "🔔 라이브 스코어 알림을 켰습니다.\n경기 시작 / 맵 종료 / 최종 스코어를 알려드립니다." if on else "🔕 라이브 스코어 알림을 껐습니다."
+    await context.bot.send_message(update.effective_chat.id, text, parse_mode='HTML')
+
+@Metrics.instrument('perf')
+async def cmd_perf(update, context):
+    """관리자 전용 성능 요약"""
+    if not update.effective_user or str(update.effective_user.id) not in Config.ADMIN_IDS: return
+    doc = Doc()
+    for title, name in (("명령", 'dotori_command_seconds'), ("외부 API", 'dotori_upstream_seconds'),
+                        ("전송/수정", 'dotori_platform_seconds'), ("대진표 캡처", 'dotori_capture_seconds')):
+        rows = Metrics.summary(name)
+        if not rows: continue
+        doc.line(('b', f"[{title}]"))
+        doc.pre([f"{label or '-':<20} n={count:<5} avg={avg:.2f}s p50≤{p50}s p95≤{p95}s"] for label, count, avg, p50, p95 in rows)
+    errors = sorted((labels, v) for (n, labels), v in Metrics._counters.items() if n.endswith('_errors_total'))
+    if errors:
+        doc.line(('b', "[오류]"))
+        doc.pre([", ".join(f"{k}={v}" for k, v in labels) + f" : {count}"] for labels, count in errors)
+    lag = Metrics._gauges.get(('dotori_loop_lag_max_seconds', ()), 0)
+    doc.line(f"이벤트 루프 지연 최대: {lag * 1000:.1f}ms")
+    doc.line(('code', f"#updated {Utils.format_timestamp()}"))
+    await context.bot.send_message(update.effective_chat.id, doc.render('html'), parse_mode='HTML')
+
+@Metrics.instrument('callback')
 async def on_callback(update, context):
     query = update.callback_query; await query.answer()
     # refresh 관련 로직 삭제됨
     if query.data.startswith('vct_'):
         region = query.data.replace('vct_', '')
         league_path = ValorantService.get_current_league_path(region)
-        status_msg = await query.message.reply_text(f"⏳ <b>{region}</b> 대진표 생성 중...\n", parse_mode='HTML')
-        
-        photo = await ValorantService.capture_bracket(league_path)
-        if photo:
-            wiki_url = f"https://liquipedia.net/valorant/{league_path}"
+        # 캐시에 있으면 바로 응답, 없을 때만 생성 중 메시지 표시
+        status_msg = None
+        if BracketCache.peek(league_path) is None:
+            status_msg = await query.message.reply_text(f"⏳ <b>{region}</b> 대진표 생성 중...\n", parse_mode='HTML')
+
+        entry = await BracketCache.get(league_path)
+        if entry:
+            wiki_url = f"{Config.LIQUIPEDIA_BASE}/valorant/{league_path}"
             caption_text = f"📊 <b><a href='{wiki_url}'>{region} 현재 대진표</a></b>"
-            await query.message.reply_photo(
-                photo=photo, 
-                caption=caption_text, 
+            sent = await query.message.reply_photo(
+                photo=entry['file_id'] or io.BytesIO(entry['bytes']),
+                caption=caption_text,
                 parse_mode='HTML'
             )
-            
+            if not entry['file_id'] and sent.photo:
+                BracketCache.set_file_id(league_path, entry['hash'], sent.photo[-1].file_id)
         else:
             await query.message.reply_text("❌ 대진표를 가져오지 못했습니다.")
-        await status_msg.delete()
+        if status_msg: await status_msg.delete()
 
-# 디스코드 명령어
-@tree.command(name="stat", description="발로란트 유저 전적 및 티어 조회")
-@app_commands.describe(player="닉네임#태그 형식으로 입력 (예: lissa#vlr)")
-async def discord_stat(interaction: discord.Interaction, player: str):
+# 디스코드 명령어 (create_discord_client 에서 등록)
+@Metrics.instrument('discord_stat')
+async def discord_stat(interaction: 'discord.Interaction', player: str):
     await interaction.response.defer()
     try:
         if '#' not in player:
             await interaction.followup.send("❌ 형식: 닉네임#태그 (예: lissa#vlr)")
             return
-        name, tag = player.split('#')
-        res_html = await ValorantService.get_player_stats(name, tag)
-        await interaction.followup.send(Utils.html_to_discord(res_html))
+        reply = StreamedReply(
+            send=lambda text: interaction.followup.send(text, wait=True),
+            edit=lambda msg, text: msg.edit(content=text),
+            delete=lambda msg: msg.delete(), limit=Config.DISCORD_MSG_LIMIT
+        )
+        await stream_player_stats(ValorantService.parse_players(player), reply, 'markdown')
     except Exception as e:
-        await interaction.followup.send(f"❌ 오류 발생: {e}")
+        Metrics.inc('dotori_command_errors_total', command='discord_stat')
+        print(f"Discord Stat Error: {e}")
+        await interaction.followup.send("❌ 전적 조회 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+
+def create_discord_client():
+    import discord
+    from discord import app_commands
+    intents = discord.Intents.default(); intents.message_content = True; intents.members = True; intents.voice_states = True
+    dc = discord.Client(intents=intents); tree = app_commands.CommandTree(dc)
+    tree.command(name="stat", description="발로란트 유저 전적 및 티어 조회")(
+        app_commands.describe(player="닉네임#태그 형식으로 입력, 여러 명은 띄어쓰기로 구분 (예: lissa#vlr abc#kr1)")(discord_stat))
+
+    @dc.event
+    async def on_ready():
+        print(f'{dc.user} 연결 성공!')
+        try:
+            # await tree.sync()
+            print("명령어 동기화 완료 (또는 스킵됨)")
+        except Exception as e:
+            print(f"동기화 오류: {e}")
+    return dc
 
 async def setup_telegram_bot():
-    global telegram_app, telegram_chats; telegram_chats = load_chats()
+    from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+    global telegram_app; await ChatRegistry.load()
     telegram_app = Application.builder().token(Config.TELEGRAM_TOKEN).build()
-    await telegram_app.initialize(); await telegram_app.start(); await telegram_app.updater.start_polling(drop_pending_updates=True)
+    # 핸들러를 모두 등록한 뒤에 폴링 시작
     telegram_app.add_handler(CommandHandler('help', cmd_help))
     # /online 핸들러 삭제됨
     telegram_app.add_handler(CommandHandler('val', cmd_val))
     telegram_app.add_handler(CommandHandler('vct', cmd_vct))
     telegram_app.add_handler(CommandHandler('lol', cmd_lol))
     telegram_app.add_handler(CommandHandler('stat', cmd_stat))
+    telegram_app.add_handler(CommandHandler('live', cmd_live))
+    telegram_app.add_handler(CommandHandler('perf', cmd_perf))
     telegram_app.add_handler(CallbackQueryHandler(on_callback))
+    await telegram_app.initialize(); await telegram_app.start(); await telegram_app.updater.start_polling(drop_pending_updates=True)
+    Broadcaster.start(lambda cid, text: telegram_app.bot.send_message(cid, text, parse_mode='HTML', disable_web_page_preview=True))
+    LiveWatcher.start()
+    # 대진표(/vct)는 텔레그램 전용이므로 브라우저 / 주기적 렌더링도 텔레그램이 켜질 때만 시작
+    BracketCache.start()
     print('Telegram Bot Started')
+    return telegram_app
 
-@client.event
-async def on_ready():
-    print(f'{client.user} 연결 성공!')
-    try:
-        # await tree.sync() 
-        print("명령어 동기화 완료 (또는 스킵됨)")
-    except Exception as e:
-        print(f"동기화 오류: {e}")
+async def run_discord():
+    global client
+    client = create_discord_client()
+    async with client: await client.start(Config.DISCORD_TOKEN)
 
-    if not telegram_app: 
+async def run_telegram():
+    try:
         await setup_telegram_bot()
+        await asyncio.Event().wait()
+    finally:
+        if telegram_app:
+            if telegram_app.updater.running: await telegram_app.updater.stop()
+            if telegram_app.running: await telegram_app.stop()
+            await telegram_app.shutdown()
+
+async def supervise(name, run):
+    """프론트엔드 하나를 실행하고, 죽으면 지수 백오프로 다시 시작 (다른 프론트엔드에는 영향 없음)"""
+    delay = 1
+    while True:
+        started = time.monotonic()
+        try:
+            await run()
+            print(f"{name} 종료됨, 재시작합니다.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"{name} 오류: {e!r}")
+        if time.monotonic() - started > Config.RESTART_MAX_DELAY: delay = 1
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, Config.RESTART_MAX_DELAY)
+
+async def warm_up():
+    """첫 사용자 요청이 가장 느리지 않도록 일정 / 시즌 정보를 미리 받아 캐시에 넣어둠"""
+    request_priority.set(BACKGROUND)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        ValorantService.get_matches_message(), LolService.get_matches_message(), ValorantService.get_season_info(),
+        return_exceptions=True
+    )
+    failed = [r for r in results if isinstance(r, BaseException)]
+    print(f"Warm-up 완료 ({time.perf_counter() - start:.1f}s, 실패 {len(failed)}건)")
+
+async def main():
+    await HttpClient.start()
+    await Metrics.start()
+    frontends = []
+    if Config.TELEGRAM_TOKEN: frontends.append(asyncio.create_task(supervise('Telegram', run_telegram)))
+    if Config.DISCORD_TOKEN: frontends.append(asyncio.create_task(supervise('Discord', run_discord)))
+    if not frontends: print("DISCORD_TOKEN / TELEGRAM_TOKEN 이 설정되지 않았습니다.")
+    warm = asyncio.create_task(warm_up()) if Config.WARMUP and frontends else None
+    try:
+        await asyncio.gather(*frontends)
+    finally:
+        for task in frontends + [warm]:
+            if task and not task.done(): task.cancel()
+        await asyncio.gather(*(t for t in frontends + [warm] if t), return_exceptions=True)
+        await LiveWatcher.stop()
+        await Broadcaster.stop()
+        await BracketCache.stop()
+        await BrowserPool.close()
+        ImageProcessor.close()
+        await ChatRegistry.close()
+        await Storage.close()
+        await HttpClient.close()
+        await Metrics.stop()
 
 if __name__ == "__main__":
-    client.run(Config.DISCORD_TOKEN)
\ No newline at end of file
+    # 루트는 WARNING 으로 두고 봇 라이브러리만 INFO (httpx 는 INFO 에서 봇 토큰이 든 요청 URL 을 남김)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    for name in ('discord', 'telegram'): logging.getLogger(name).setLevel(logging.INFO)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    asyncio.run(main())
@@ -0,0 +1,335 @@
+"""
+Dotori 오프라인 부하 테스트 / 벤치마크
+
+외부 API 는 모두 로컬 목 서버(mock_upstream.py, 별도 프로세스)로 바꾸고, 가짜 텔레그램/디스코드
+업데이트로 핸들러(cmd_val, cmd_lol, cmd_stat, on_callback, discord_stat)를 지정한 동시성으로 호출해
+처리량과 p50/p95/p99 지연, 최대 RSS 를 출력합니다.
+
+    python bench/bench.py --requests 200 --concurrency 20 --latency 80
+    python bench/bench.py --scenarios stat,discord_stat --players 50 --multi 5 --cold
+    python bench/bench.py --error-rate 0.05 --throttle-rate 0.02 --out bench_output.txt
+
+on_callback(/vct 대진표)은 playwright + chromium 이 설치되어 있을 때만 실행됩니다.
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import mock_upstream
+
+SCENARIOS = ('val', 'lol', 'stat', 'callback', 'discord_stat')
+
+
+# ================ [가짜 텔레그램 / 디스코드 객체] ================
+class Outbox:
+    """핸들러가 보낸 메시지 기록 (실패 응답 판별용)"""
+    def __init__(self):
+        self.sent, self.failures = 0, 0
+        self._ids = itertools.count(1)
+
+    def record(self, text):
+        self.sent += 1
+        if text and text.lstrip().startswith("❌"): self.failures += 1
+        return next(self._ids)
+
+
+class FakePhotoSize:
+    def __init__(self, file_id):
+        self.file_id = file_id
+
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text=None, photo=None):
+        self.bot, self.chat_id, self.text = bot, chat_id, text
+        self.message_id = bot.outbox.record(text)
+        self.photo = [FakePhotoSize(f"file-{self.message_id}")] if photo is not None else []
+
+    async def reply_text(self, text, **kwargs):
+        return await self.bot.send_message(self.chat_id, text)
+
+    async def reply_photo(self, photo, caption=None, **kwargs):
+        if hasattr(photo, 'read'): photo.read()
+        return FakeMessage(self.bot, self.chat_id, caption, photo=photo)
+
+    async def delete(self):
+        return True
+
+
+class FakeBot:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return FakeMessage(self, chat_id, text)
+
+    async def edit_message_text(self, text=None, chat_id=None, message_id=None, **kwargs):
+        self.outbox.record(text)
+        return True
+
+
+class FakeChat:
+    def __init__(self, chat_id):
+        self.id, self.title, self.first_name = chat_id, f"bench-{chat_id}", None
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeQuery:
+    def __init__(self, bot, chat_id, data):
+        self.data, self.message = data, FakeMessage(bot, chat_id)
+
+    async def answer(self):
+        return True
+
+
+class FakeUpdate:
+    def __init__(self, bot, chat_id, callback_data=None):
+        self.effective_chat, self.effective_user = FakeChat(chat_id), FakeUser(chat_id)
+        self.callback_query = FakeQuery(bot, chat_id, callback_data) if callback_data else None
+
+
+class FakeContext:
+    def __init__(self, bot, args=None):
+        self.bot, self.args = bot, args or []
+
+
+class FakeDiscordMessage:
+    def __init__(self, outbox, content):
+        self.outbox = outbox
+        outbox.record(content)
+
+    async def edit(self, content=None, **kwargs):
+        self.outbox.record(content)
+
+    async def delete(self):
+        return True
+
+
+class FakeFollowup:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    async def send(self, content=None, wait=False, **kwargs):
+        return FakeDiscordMessage(self.outbox, content)
+
+
+class FakeResponse:
+    async def defer(self, **kwargs):
+        return None
+
+
+class FakeInteraction:
+    def __init__(self, outbox):
+        self.response, self.followup = FakeResponse(), FakeFollowup(outbox)
+
+
+# ================ [측정] ================
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS 는 바이트
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+async def run_scenario(name, call, total, concurrency, before=None):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with sem:
+            if before: await before()
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception as e:
+                errors += 1
+                if errors <= 3: print(f"  [{name}] error: {e!r}")
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        'scenario': name, 'requests': total, 'errors': errors, 'elapsed': elapsed,
+        'rps': total / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000, 'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000, 'rss': peak_rss_mb(),
+    }
+
+
+def format_report(results, args):
+    lines = [
+        f"Dotori bench  requests={args.requests} concurrency={args.concurrency} latency={args.latency}ms "
+        f"jitter={args.jitter}ms error={args.error_rate} throttle={args.throttle_rate} timeout={args.timeout_rate} "
+        f"cold={args.cold}",
+        f"{'scenario':<14}{'req':>6}{'err':>6}{'fail msg':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}",
+    ]
+    for r in results:
+        lines.append(f"{r['scenario']:<14}{r['requests']:>6}{r['errors']:>6}{r['failures']:>10}{r['rps']:>10.1f}"
+                     f"{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['rss']:>13.1f}")
+    return "\n".join(lines)
+
+
+# ================ [실행] ================
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"mock upstream did not start on port {port}")
+
+
+async def has_browser():
+    """playwright 와 chromium 이 실제로 실행 가능한지 확인"""
+    try:
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            await browser.close()
+        return True
+    except Exception:
+        return False
+
+
+async def bench(args, port):
+    await wait_for_port(port)
+    # 목 서버 주소와 임시 DB 를 환경 변수로 지정한 뒤에 봇 모듈을 불러옴
+    dotori = importlib.import_module('Dotori')
+    cfg = dotori.Config
+    cfg.HTTP_MAX_RETRIES, cfg.HTTP_RETRY_BACKOFF = args.retries, 0.05
+
+    await dotori.HttpClient.start()
+    await dotori.ChatRegistry.load()
+
+    players = [f"bench{i}#kr{i % 7}" for i in range(args.players)]
+    chat_ids = itertools.cycle(range(1, 1001))
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    results = []
+
+    def stat_args(i):
+        # --cold: 요청마다 처음 보는 플레이어를 써서 SQLite 전적 저장소도 항상 빈 상태에서 조회
+        # (요청 중간에 DB 를 비우면 동시에 진행 중인 다른 요청의 저장분까지 지워짐)
+        if args.cold: return [f"cold{i}x{k}#kr{k % 7}" for k in range(args.multi)]
+        return [players[(i * args.multi + k) % len(players)] for k in range(args.multi)]
+
+    async def tg_call(handler, i, **kwargs):
+        bot = FakeBot(outbox)
+        await handler(FakeUpdate(bot, next(chat_ids), kwargs.get('callback_data')), FakeContext(bot, kwargs.get('args')))
+
+    calls = {
+        'val': lambda i: tg_call(dotori.cmd_val, i),
+        'lol': lambda i: tg_call(dotori.cmd_lol, i),
+        'stat': lambda i: tg_call(dotori.cmd_stat, i, args=stat_args(i)),
+        'callback': lambda i: tg_call(dotori.on_callback, i, callback_data=f"vct_{dotori.Config.VCT_REGIONS[i % len(dotori.Config.VCT_REGIONS)]}"),
+        'discord_stat': lambda i: dotori.discord_stat(FakeInteraction(outbox), " ".join(stat_args(i))),
+    }
+
+    async def clear_caches():
+        # 응답 캐시뿐 아니라 롤 일정 메모리도 비워야 실제 콜드 경로를 잼
+        dotori.response_cache.clear()
+        dotori.BracketCache._entries.clear()
+        lol = dotori.LolService
+        lol._events.clear(); lol._covered_until.clear(); lol._sorted, lol._dirty, lol._loaded_at, lol._refreshing = [], False, None, None
+
+    try:
+        for name in scenarios:
+            if name not in calls:
+                print(f"unknown scenario: {name}")
+                continue
+            if name == 'callback' and not await has_browser():
+                print("skip callback: playwright/chromium is not installed")
+                continue
+            outbox = Outbox()
+            total = args.requests if name != 'callback' else min(args.requests, args.callback_requests)
+            print(f"running {name} x{total} ...")
+            result = await run_scenario(name, calls[name], total, args.concurrency, clear_caches if args.cold else None)
+            result['failures'] = outbox.failures
+            results.append(result)
+    finally:
+        await dotori.BracketCache.stop()
+        await dotori.BrowserPool.close()
+        dotori.ImageProcessor.close()
+        await dotori.ChatRegistry.close()
+        await dotori.Storage.close()
+        await dotori.HttpClient.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dotori 오프라인 벤치마크")
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS), help=f"쉼표 구분 ({', '.join(SCENARIOS)})")
+    parser.add_argument('--requests', type=int, default=100, help="시나리오별 요청 수")
+    parser.add_argument('--callback-requests', type=int, default=20, help="대진표 캡처 요청 수 상한")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--players', type=int, default=20, help="/stat 에 쓸 서로 다른 플레이어 수")
+    parser.add_argument('--multi', type=int, default=1, help="/stat 한 번에 조회할 인원")
+    parser.add_argument('--cold', action='store_true', help="요청마다 응답/대진표 캐시와 롤 일정을 비우고, /stat 은 처음 보는 플레이어로 조회")
+    parser.add_argument('--latency', type=float, default=50, help="목 서버 응답 지연 (ms)")
+    parser.add_argument('--jitter', type=float, default=20, help="지연 편차 (ms)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="5xx 비율")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="429 비율")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="응답하지 않는 요청 비율")
+    parser.add_argument('--retries', type=int, default=2, help="봇 HTTP 재시도 횟수")
+    parser.add_argument('--henrik-rate', type=int, default=100000, help="Henrik 분당 요청 한도")
+    parser.add_argument('--payloads', help="녹화한 응답 파일 디렉터리 (mock_upstream.PAYLOAD_FILES)")
+    parser.add_argument('--out', help="결과를 추가로 기록할 파일")
+    args = parser.parse_args()
+
+    port = free_port()
+    db_dir = tempfile.mkdtemp(prefix='dotori-bench-')
+    os.environ.update(mock_upstream.base_urls('127.0.0.1', port))
+    os.environ.update({
+        'DB_FILE': os.path.join(db_dir, 'bench.db'), 'METRICS_PORT': '0',
+        'HENRIK_API_KEY': 'bench', 'LOL_API_KEY': 'bench',
+        'HENRIK_RATE_LIMIT': str(args.henrik_rate), 'BRACKET_REFRESH_INTERVAL': '86400',
+    })
+
+    server = multiprocessing.Process(target=mock_upstream.serve, daemon=True, kwargs=dict(
+        host='127.0.0.1', port=port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, timeout_rate=args.timeout_rate, payloads=args.payloads))
+    server.start()
+    try:
+        results = asyncio.run(bench(args, port))
+    finally:
+        server.terminate()
+        server.join()
+
+    report = format_report(results, args)
+    print(report)
+    if args.out:
+        with open(args.out, 'a', encoding='utf-8') as f: f.write(report + "\n\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+벤치마크용 로컬 목 서버: vlrggapi / henrikdev / valorant-api / lolesports / Liquipedia 를 흉내냄
+
+* 기본 응답은 실제 API 모양을 따라 현재 시각 기준으로 생성
+* --payloads 디렉터리에 녹화한 JSON/HTML 이 있으면 그 파일을 그대로 재생
+* 지연(latency/jitter)과 오류(5xx / 429 / 타임아웃) 주입 가능
+
+단독 실행: python bench/mock_upstream.py --port 8900 --latency 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+# 녹화 파일 이름 (--payloads 디렉터리 안)
+PAYLOAD_FILES = {
+    'vlr_live': 'vlr_live.json', 'vlr_upcoming': 'vlr_upcoming.json', 'vlr_results': 'vlr_results.json',
+    'val_seasons': 'val_seasons.json', 'henrik_account': 'henrik_account.json',
+    'henrik_mmr': 'henrik_mmr.json', 'henrik_mmr_history': 'henrik_mmr_history.json',
+    'henrik_matches': 'henrik_matches.json', 'lol_schedule': 'lol_schedule.json',
+    'bracket': 'bracket.html',
+}
+
+TEAMS = ['Paper Rex', 'DRX', 'T1', 'Gen.G', 'Sentinels', 'LOUD', 'FNATIC', 'Team Heretics', 'EDward Gaming', 'Team Liquid']
+LOL_TEAMS = ['T1', 'GEN', 'HLE', 'DK', 'KT', 'BLG', 'G2', 'FLY']
+MAPS = ['Ascent', 'Bind', 'Haven', 'Lotus', 'Sunset', 'Pearl', 'Split']
+
+
+def _utc(offset_hours):
+    return datetime.now(timezone.utc) + timedelta(hours=offset_hours)
+
+
+def vlr_live():
+    return {'data': {'status': 200, 'segments': [
+        {'team1': TEAMS[i], 'team2': TEAMS[i + 1], 'score1': str(i % 2), 'score2': '0',
+         'current_map': MAPS[i], 'map_number': str(i % 2 + 1), 'match_event': 'Champions Tour 2026: Pacific Stage 2'}
+        for i in range(0, 4, 2)
+    ]}}
+
+
+def vlr_upcoming():
+    return {'data': {'status': 200, 'segments': [
+        {'team1': TEAMS[i % len(TEAMS)], 'team2': TEAMS[(i + 3) % len(TEAMS)],
+         'match_event': ['Champions Tour 2026: Pacific Stage 2', 'Champions Tour 2026: EMEA Stage 2'][i % 2],
+         'unix_timestamp': _utc(2 + i * 5).strftime('%Y-%m-%d %H:%M:%S')}
+        for i in range(20)
+    ]}}
+
+
+def vlr_results():
+    return {'data': {'status': 200, 'segments': [
+        {'team1': TEAMS[i], 'team2': TEAMS[i + 1], 'score1': '2', 'score2': str(i % 2),
+         'time_completed': f"{i + 1}h {i * 7 % 60}m ago", 'tournament_name': 'Champions Tour 2026: Pacific Stage 2'}
+        for i in range(0, 8, 2)
+    ]}}
+
+
+def val_seasons():
+    return {'status': 200, 'data': [
+        {'uuid': f"s{i}", 'startTime': _utc(-24 * 60 * (3 - i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+         'endTime': _utc(-24 * 60 * (2 - i)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        for i in range(4)
+    ]}
+
+
+def henrik_account(name, tag):
+    return {'status': 200, 'data': {'puuid': f"puuid-{name}-{tag}".lower(), 'region': 'kr', 'name': name, 'tag': tag, 'account_level': 200}}
+
+
+def henrik_mmr(puuid):
+    return {'status': 200, 'data': {'current': {'tier': {'id': 18, 'name': 'Diamond 1'}, 'rr': 47}}}
+
+
+def henrik_mmr_history(puuid):
+    return {'status': 200, 'data': {'history': [
+        {'match_id': f"{puuid}-m{i}", 'last_change': random.choice([-21, -17, 14, 19, 23])} for i in range(10)
+    ]}}
+
+
+def henrik_matches(name, tag, size):
+    puuid = f"puuid-{name}-{tag}".lower()
+    start = int(_utc(-1).timestamp())
+    matches = []
+    for i in range(size):
+        won = i % 3 != 0
+        players = [{'puuid': puuid, 'team': 'Red', 'stats': {'kills': 15 + i, 'deaths': 12, 'assists': 4, 'score': 4200 + 100 * i}}]
+        players += [{'puuid': f"other-{j}", 'team': 'Blue' if j % 2 else 'Red',
+                     'stats': {'kills': 10, 'deaths': 10, 'assists': 5, 'score': 3000}} for j in range(9)]
+        matches.append({
+            'metadata': {'matchid': f"{puuid}-m{i}", 'map': MAPS[i % len(MAPS)], 'game_start': start - i * 3600, 'rounds_played': 22},
+            'players': {'all_players': players},
+            'teams': {'red': {'has_won': won, 'rounds_won': 13 if won else 9, 'rounds_lost': 9 if won else 13},
+                      'blue': {'has_won': not won, 'rounds_won': 9 if won else 13, 'rounds_lost': 13 if won else 9}},
+        })
+    return {'status': 200, 'data': matches}
+
+
+def lol_schedule(league_id, page_token=None):
+    base = 0 if page_token is None else 24 * 7
+    events = []
+    for i in range(12):
+        t1, t2 = LOL_TEAMS[i % len(LOL_TEAMS)], LOL_TEAMS[(i + 3) % len(LOL_TEAMS)]
+        events.append({
+            'startTime': _utc(base - 24 + i * 14).strftime('%Y-%m-%dT%H:%M:%SZ'), 'state': 'unstarted', 'type': 'match',
+            'league': {'name': league_id},
+            'match': {'id': f"{league_id}-{page_token or 0}-{i}", 'teams': [{'code': t1}, {'code': t2}], 'strategy': {'type': 'bestOf', 'count': 3 if i % 4 else 5}},
+        })
+    pages = {'older': 'older-token', 'newer': None if page_token else 'newer-token'}
+    return {'data': {'schedule': {'pages': pages, 'events': events}}}
+
+
+def bracket_html():
+    cells = "".join(
+        f"<div class='brkts-match'><div>{TEAMS[i % len(TEAMS)]} 2</div><div>{TEAMS[(i + 1) % len(TEAMS)]} 1</div></div>"
+        for i in range(16)
+    )
+    return f"""<!doctype html><html><head><style>
+body {{ background: #121212; color: #eee; font-family: sans-serif; }}
+.brkts-bracket {{ display: grid; grid-template-columns: repeat(4, 260px); gap: 24px; padding: 40px; }}
+.brkts-match {{ background: #1e1e1e; border: 1px solid #333; padding: 8px; }}
+</style></head><body><div class='brkts-bracket'>{cells}</div></body></html>"""
+
+
+class MockUpstream:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, timeout_rate=0.0, payloads=None):
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.throttle_rate, self.timeout_rate = error_rate, throttle_rate, timeout_rate
+        self.recorded = {}
+        if payloads:
+            for key, fname in PAYLOAD_FILES.items():
+                path = os.path.join(payloads, fname)
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self.recorded[key] = f.read() if fname.endswith('.html') else json.load(f)
+
+    def payload(self, key, build, *args):
+        return self.recorded[key] if key in self.recorded else build(*args)
+
+    @web.middleware
+    async def inject(self, request, handler):
+        # 지연 / 오류 주입
+        await asyncio.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+        roll = random.random()
+        if roll < self.timeout_rate:
+            await asyncio.sleep(3600)
+        if roll < self.timeout_rate + self.error_rate:
+            return web.Response(status=503, text='injected error')
+        if roll < self.timeout_rate + self.error_rate + self.throttle_rate:
+            return web.Response(status=429, headers={'Retry-After': '1'}, text='injected throttle')
+        return await handler(request)
+
+    async def vlr_match(self, request):
+        q = request.query.get('q')
+        if q == 'live_score': return web.json_response(self.payload('vlr_live', vlr_live))
+        if q == 'results': return web.json_response(self.payload('vlr_results', vlr_results))
+        return web.json_response(self.payload('vlr_upcoming', vlr_upcoming))
+
+    async def seasons(self, request):
+        return web.json_response(self.payload('val_seasons', val_seasons))
+
+    async def account(self, request):
+        return web.json_response(self.payload('henrik_account', henrik_account, request.match_info['name'], request.match_info['tag']))
+
+    async def mmr(self, request):
+        return web.json_response(self.payload('henrik_mmr', henrik_mmr, request.match_info['puuid']))
+
+    async def mmr_history(self, request):
+        return web.json_response(self.payload('henrik_mmr_history', henrik_mmr_history, request.match_info['puuid']))
+
+    async def matches(self, request):
+        size = int(request.query.get('size', 10))
+        data = self.payload('henrik_matches', henrik_matches, request.match_info['name'], request.match_info['tag'], size)
+        return web.json_response({**data, 'data': data.get('data', [])[:size]})
+
+    async def schedule(self, request):
+        return web.json_response(self.payload('lol_schedule', lol_schedule, request.query.get('leagueId'), request.query.get('pageToken')))
+
+    async def bracket(self, request):
+        return web.Response(text=self.payload('bracket', bracket_html), content_type='text/html')
+
+    def app(self):
+        app = web.Application(middlewares=[self.inject])
+        app.router.add_get('/vlr/match', self.vlr_match)
+        app.router.add_get('/valapi/v1/seasons/competitive', self.seasons)
+        app.router.add_get('/henrik/valorant/v1/account/{name}/{tag}', self.account)
+        app.router.add_get('/henrik/valorant/v3/by-puuid/mmr/{region}/pc/{puuid}', self.mmr)
+        app.router.add_get('/henrik/valorant/v2/by-puuid/mmr-history/{region}/pc/{puuid}', self.mmr_history)
+        app.router.add_get('/henrik/valorant/v3/matches/{region}/{name}/{tag}', self.matches)
+        app.router.add_get('/lolesports/persisted/gw/getSchedule', self.schedule)
+        app.router.add_get('/liquipedia/valorant/{path:.*}', self.bracket)
+        return app
+
+
+def base_urls(host, port):
+    """Dotori 의 외부 API 주소 환경 변수 -> 목 서버 주소"""
+    root = f"http://{host}:{port}"
+    return {
+        'VLR_API_BASE': f"{root}/vlr", 'VALORANT_API_BASE': f"{root}/valapi", 'HENRIK_API_BASE': f"{root}/henrik",
+        'LOL_API_BASE': f"{root}/lolesports", 'LIQUIPEDIA_BASE': f"{root}/liquipedia",
+    }
+
+
+def serve(host='127.0.0.1', port=8900, **options):
+    web.run_app(MockUpstream(**options).app(), host=host, port=port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dotori 벤치마크용 외부 API 목 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=50, help="응답 지연 (ms)")
+    parser.add_argument('--jitter', type=float, default=20, help="지연 편차 (ms)")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--payloads', help="녹화한 응답 파일 디렉터리")
+    args = parser.parse_args()
+    print(f"mock upstream on http://{args.host}:{args.port}")
+    for k, v in base_urls(args.host, args.port).items(): print(f"  {k}={v}")
+    serve(args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+          throttle_rate=args.throttle_rate, timeout_rate=args.timeout_rate, payloads=args.payloads)